@@ -0,0 +1,64 @@
+# Per-file cost of an office conversion with the shared ConverterContext reset ("cold") or kept ("warm"):
+#   python scripts/benchmark_office_convert.py deck.pptx --runs 5
+from __future__ import annotations
+from pathlib import Path
+import argparse
+import json
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from compressor_and_pdf_merger.services.office_convert import (  # noqa: E402
+    ConverterContext,
+    docx_to_pdf_basic,
+    get_converter_context,
+    pptx_to_pdf_basic,
+    xlsx_to_pdf_basic,
+)
+
+
+def _warm_up(ctx: ConverterContext) -> None:
+    ctx.fonts()
+    ctx.soffice()
+    ctx.pil_font(12)
+
+
+def benchmark_converter_context(src: str | Path, *, runs: int = 5) -> dict:
+    # "cold" resets the context before every file, which is what each conversion used to pay
+    src = Path(src)
+    ext = src.suffix.lower()
+    convert = docx_to_pdf_basic if ext in {".doc", ".docx"} else xlsx_to_pdf_basic if ext in {".xls", ".xlsx"} else pptx_to_pdf_basic
+    runs = max(1, int(runs))
+    ctx = get_converter_context()
+    timings = {}
+    for label in ("cold", "warm"):
+        t0 = time.perf_counter()
+        for _ in range(runs):
+            if label == "cold":
+                ctx.reset()
+            _warm_up(ctx)
+        timings[f"setup_{label}_ms"] = round((time.perf_counter() - t0) / runs * 1000, 2)
+    with tempfile.TemporaryDirectory(prefix="cpm_bench_") as tmp:
+        for label in ("cold", "warm"):
+            t0 = time.perf_counter()
+            for i in range(runs):
+                if label == "cold":
+                    ctx.reset()
+                convert(src, Path(tmp) / f"{label}_{i}.pdf")
+            timings[f"{label}_s_per_file"] = round((time.perf_counter() - t0) / runs, 3)
+    timings["saved_ms_per_file"] = round(timings["setup_cold_ms"] - timings["setup_warm_ms"], 2)
+    return timings
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("src")
+    ap.add_argument("--runs", type=int, default=5)
+    args = ap.parse_args()
+    print(json.dumps(benchmark_converter_context(args.src, runs=args.runs), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# Timings of the PDF export services on a given file (images: serial vs parallel, text: per mode):
+#   python scripts/benchmark_pdf_convert.py big.pdf --dpi 300 --workers 4
+from __future__ import annotations
+from pathlib import Path
+import argparse
+import json
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from compressor_and_pdf_merger.services.pdf_convert import pdf_to_images, pdf_to_text  # noqa: E402
+from compressor_and_pdf_merger.services.pdf_utils import default_workers  # noqa: E402
+
+
+def benchmark_pdf_to_images(src_pdf: str | Path, *, fmt: str = "png", dpi: int = 300, page_range: str | None = None, workers: int | None = None) -> dict:
+    timings = {}
+    for label, n in (("serial_s", 1), ("parallel_s", workers)):
+        out_dir = Path(tempfile.mkdtemp(prefix="cpm_bench_"))
+        try:
+            t0 = time.perf_counter()
+            pdf_to_images(src_pdf, out_dir, fmt=fmt, dpi=dpi, page_range=page_range, workers=n)
+            timings[label] = round(time.perf_counter() - t0, 2)
+        finally:
+            shutil.rmtree(out_dir, ignore_errors=True)
+    timings["workers"] = workers or default_workers()
+    timings["speedup"] = round(timings["serial_s"] / max(timings["parallel_s"], 1e-6), 2)
+    return timings
+
+
+def benchmark_pdf_to_text(src_pdf: str | Path, *, page_range: str | None = None, workers: int | None = None) -> dict:
+    timings = {}
+    with tempfile.TemporaryDirectory(prefix="cpm_bench_") as tmp:
+        for mode in ("plain", "blocks", "words"):
+            t0 = time.perf_counter()
+            pdf_to_text(src_pdf, Path(tmp) / f"{mode}.txt", mode=mode, page_range=page_range, workers=workers)
+            timings[f"{mode}_s"] = round(time.perf_counter() - t0, 2)
+    timings["workers"] = workers or default_workers()
+    return timings
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("pdf")
+    ap.add_argument("--fmt", default="png", choices=("jpg", "png", "tif"))
+    ap.add_argument("--dpi", type=int, default=300)
+    ap.add_argument("--pages")
+    ap.add_argument("--workers", type=int)
+    ap.add_argument("--only", choices=("images", "text"))
+    args = ap.parse_args()
+    result = {}
+    if args.only != "text":
+        result["images"] = benchmark_pdf_to_images(args.pdf, fmt=args.fmt, dpi=args.dpi, page_range=args.pages, workers=args.workers)
+    if args.only != "images":
+        result["text"] = benchmark_pdf_to_text(args.pdf, page_range=args.pages, workers=args.workers)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
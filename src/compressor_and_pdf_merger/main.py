@@ -1,4 +1,5 @@
 import sys
+import multiprocessing
 from PyQt6.QtWidgets import QApplication, QMainWindow
 from compressor_and_pdf_merger.ui.main_window import MainWindow
 from compressor_and_pdf_merger.storage.db import init_db
@@ -11,4 +12,5 @@ def main():
     sys.exit(app.exec())
 
 if __name__ == '__main__':
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
@@ -0,0 +1,62 @@
+from __future__ import annotations
+from pathlib import Path
+from typing import Callable, Optional
+import hashlib
+import os
+import shutil
+import threading
+from platformdirs import user_cache_dir
+from compressor_and_pdf_merger.storage.db import APP_NAME, APP_AUTHOR
+from .disk_cache import DiskCache
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+def file_sha256(path: str | Path, chunk: int = 1024 * 1024) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            b = f.read(chunk)
+            if not b:
+                break
+            h.update(b)
+    return h.hexdigest()
+
+
+class ConvertCache(DiskCache):
+    def __init__(self, root: str | Path, max_bytes: int = DEFAULT_MAX_BYTES):
+        super().__init__(root, ".pdf", max_bytes)
+
+    def key(self, src_sha256: str, fingerprint: str) -> str:
+        return hashlib.sha256(f"{src_sha256}|{fingerprint}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str, out_pdf: str | Path) -> bool:
+        return self._read(key, lambda entry: shutil.copyfile(entry, out_pdf)) is not None
+
+    def put(self, key: str, pdf: str | Path) -> None:
+        if os.path.getsize(pdf) > self.max_bytes:
+            return
+        self._store(key, lambda part: shutil.copyfile(pdf, part))
+
+
+_cache: Optional[ConvertCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> ConvertCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ConvertCache(Path(user_cache_dir(APP_NAME, APP_AUTHOR)) / "office_pdf")
+        return _cache
+
+
+def cached_convert(src: str | Path, out_pdf: str | Path, fingerprint: str, convert: Callable[[Path, Path], str], cache: Optional[ConvertCache] = None) -> bool:
+    # fingerprint names the converter expected to run; convert returns the one that did, which may be a fallback
+    cache = cache or get_cache()
+    sha = file_sha256(src)
+    if cache.get(cache.key(sha, fingerprint), out_pdf):
+        return True
+    used = convert(Path(src), Path(out_pdf))
+    cache.put(cache.key(sha, used), out_pdf)
+    return False
@@ -0,0 +1,76 @@
+from __future__ import annotations
+from pathlib import Path
+from typing import Callable, Optional, TypeVar
+import os
+import threading
+
+T = TypeVar("T")
+
+
+class DiskCache:
+    # entries are <key><suffix> files under root; mtime is the LRU clock, the oldest go once max_bytes is exceeded
+    def __init__(self, root: str | Path, suffix: str, max_bytes: int):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.suffix = suffix
+        self.max_bytes = int(max_bytes)
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        self._lock = threading.Lock()
+
+    def _entry(self, key: str) -> Path:
+        return self.root / f"{key}{self.suffix}"
+
+    def _read(self, key: str, read: Callable[[Path], T]) -> Optional[T]:
+        entry = self._entry(key)
+        try:
+            value = read(entry)
+            os.utime(entry)
+        except OSError:
+            with self._lock:
+                self.stats["misses"] += 1
+            return None
+        with self._lock:
+            self.stats["hits"] += 1
+        return value
+
+    def _store(self, key: str, write: Callable[[Path], object]) -> None:
+        # written next to the entry and renamed, so readers never see a partial file
+        part = self.root / f"{key}.{os.getpid()}.{threading.get_ident()}.part"
+        try:
+            write(part)
+            os.replace(part, self._entry(key))
+        finally:
+            part.unlink(missing_ok=True)
+        with self._lock:
+            self.stats["stores"] += 1
+            self._evict()
+
+    def _evict(self) -> None:
+        entries = []
+        for p in self.root.glob(f"*{self.suffix}"):
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, p))
+        total = sum(e[1] for e in entries)
+        for _, size, p in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            p.unlink(missing_ok=True)
+            total -= size
+            self.stats["evictions"] += 1
+
+    def size_bytes(self) -> int:
+        total = 0
+        for p in self.root.glob(f"*{self.suffix}"):
+            try:
+                total += p.stat().st_size
+            except OSError:
+                pass
+        return total
+
+    def clear(self) -> None:
+        with self._lock:
+            for p in self.root.glob(f"*{self.suffix}"):
+                p.unlink(missing_ok=True)
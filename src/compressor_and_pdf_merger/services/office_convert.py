@@ -1,11 +1,13 @@
 from __future__ import annotations
 from pathlib import Path
+import hashlib
+import importlib.metadata
 import io
 import os
 import re
 import sys
 import shutil
-import subprocess
+import threading
 from typing import Optional, Tuple
 import mammoth
 from xhtml2pdf import pisa
@@ -16,6 +18,7 @@ from pptx import Presentation
 from pptx.enum.shapes import MSO_SHAPE_TYPE
 from PIL import Image, ImageDraw, ImageFont
 import fitz
+from .office_pool import get_pool
 
 
 EMU_PER_INCH = 914_400
@@ -23,6 +26,7 @@ NOTO_FILES = {"regular": "NotoSans-Regular.ttf", "bold": "NotoSans-Bold.ttf", "i
 DEJAVU_FILES = {"regular": "DejaVuSans.ttf", "bold": "DejaVuSans-Bold.ttf", "italic": "DejaVuSans-Oblique.ttf", "bolditalic": "DejaVuSans-BoldOblique.ttf"}
 _CTRL = "".join(chr(c) for c in range(0, 32) if c not in (9, 10, 13))
 _CTRL_RE = re.compile(f"[{re.escape(_CTRL)}]")
+_fonts_lock = threading.Lock()
 
 
 def _assets_dir() -> Path:
@@ -56,6 +60,10 @@ def _register_font_family(family_name: str, regular: Path, bold: Optional[Path]
 
 
 def _ensure_fonts() -> Tuple[str, Optional[Path]]:
+    return get_converter_context().fonts()
+
+
+def _ensure_fonts_locked() -> Tuple[str, Optional[Path]]:
     _fonts_dir().mkdir(parents=True, exist_ok=True)
     reg = _font_path((NOTO_FILES["regular"],))
     if reg:
@@ -77,6 +85,79 @@ def _ensure_fonts() -> Tuple[str, Optional[Path]]:
     return "Helvetica", None
 
 
+def _fonts_fingerprint() -> str:
+    parts = []
+    for p in sorted(_fonts_dir().glob("*.tt[fc]")):
+        try:
+            parts.append(f"{p.name}:{p.stat().st_size}")
+        except OSError:
+            pass
+    return hashlib.sha1(",".join(parts).encode("utf-8")).hexdigest()[:12]
+
+
+def _package_version(name: str) -> str:
+    try:
+        return importlib.metadata.version(name)
+    except Exception:
+        return "?"
+
+
+def _system_font_dirs() -> list[Path]:
+    home = Path.home()
+    if sys.platform == "win32":
+        windir = Path(os.environ.get("WINDIR", r"C:\Windows"))
+        local = Path(os.environ.get("LOCALAPPDATA", home / "AppData" / "Local"))
+        return [windir / "Fonts", local / "Microsoft" / "Windows" / "Fonts"]
+    if sys.platform == "darwin":
+        return [Path("/System/Library/Fonts"), Path("/Library/Fonts"), home / "Library" / "Fonts"]
+    return [Path("/usr/share/fonts"), Path("/usr/local/share/fonts"), home / ".fonts", home / ".local" / "share" / "fonts"]
+
+
+def _system_fonts_fingerprint() -> str:
+    # directory mtimes change whenever a font file is added, removed or replaced in them
+    parts = []
+    for root in _system_font_dirs():
+        for dirpath, _, _ in os.walk(root):
+            try:
+                parts.append(f"{dirpath}:{os.stat(dirpath).st_mtime_ns}")
+            except OSError:
+                pass
+    return hashlib.sha1(",".join(sorted(parts)).encode("utf-8")).hexdigest()[:12]
+
+
+def _preferred_backend() -> str:
+    if sys.platform == "win32":
+        try:
+            import win32com.client  # type: ignore  # noqa: F401
+            return "msoffice"
+        except Exception:
+            pass
+    return "soffice" if _find_soffice() else "basic"
+
+
+def converter_fingerprint(src: str | Path, backend: Optional[str] = None) -> str:
+    # backend is the one that produced the PDF (report["backend"] of a conversion); None means the one tried first
+    ext = Path(src).suffix.lower()
+    backend = backend or _preferred_backend()
+    if backend == "msoffice":
+        return f"msoffice|{ext}|{_package_version('pywin32')}"
+    if backend == "soffice":
+        exe = _find_soffice()
+        try:
+            st = Path(exe).stat()
+            version = f"{st.st_size}:{int(st.st_mtime)}"
+        except (OSError, TypeError):
+            version = "?"
+        return f"soffice|{ext}|{version}|fonts={get_converter_context().system_fonts()}"
+    if ext in {".doc", ".docx"}:
+        libs = ("mammoth", "xhtml2pdf", "reportlab")
+    elif ext in {".xls", ".xlsx"}:
+        libs = ("pandas", "openpyxl", "xhtml2pdf", "reportlab")
+    else:
+        libs = ("python-pptx", "Pillow", "PyMuPDF")
+    return f"basic|{ext}|" + ",".join(f"{n}={_package_version(n)}" for n in libs) + f"|fonts={_fonts_fingerprint()}"
+
+
 def _fallback_css(reportlab_family: str) -> str:
     family_chain = f"{reportlab_family}, 'DejaVu Sans', Arial, sans-serif"
     return "@page{size:A4;margin:18mm}" "html,body{font-size:12pt;}" f"*{{font-family:{family_chain} !important;}}" "h1,h2,h3,h4,h5,h6{font-weight:bold;}" "table{border-collapse:collapse;width:100%;}" "th,td{border:1px solid #ccc;padding:4px;vertical-align:top;text-align:left;}" "thead th{background:#f2f2f2;}" ".pb{page-break-after:always;}" "span.tab,.tab{white-space:pre;}"
@@ -89,6 +170,10 @@ def _sanitize_html(s: str) -> str:
 
 
 def _find_soffice() -> Optional[str]:
+    return get_converter_context().soffice()
+
+
+def _locate_soffice() -> Optional[str]:
     p = shutil.which("soffice")
     if p:
         return p
@@ -102,25 +187,106 @@ def _find_soffice() -> Optional[str]:
     return None
 
 
+class ConverterContext:
+    # fonts are parsed and tools located once per process; every conversion (batch merges included) shares the instance
+    def __init__(self):
+        self.stats = {"font_loads": 0, "pil_fonts": 0, "tool_lookups": 0}
+        self._lock = threading.Lock()
+        self._fonts: Optional[Tuple[str, Optional[Path]]] = None
+        self._soffice: Optional[str] = None
+        self._soffice_known = False
+        self._pil_fonts: dict[tuple[str, int], ImageFont.ImageFont] = {}
+        self._system_fonts: Optional[str] = None
+
+    def fonts(self) -> Tuple[str, Optional[Path]]:
+        with _fonts_lock:
+            if self._fonts is None:
+                self._fonts = _ensure_fonts_locked()
+                self.stats["font_loads"] += 1
+            return self._fonts
+
+    def soffice(self) -> Optional[str]:
+        with self._lock:
+            if not self._soffice_known:
+                self._soffice = _locate_soffice()
+                self._soffice_known = True
+                self.stats["tool_lookups"] += 1
+            return self._soffice
+
+    def system_fonts(self) -> str:
+        # fingerprint of the fonts an office suite lays documents out with
+        with self._lock:
+            if self._system_fonts is None:
+                self._system_fonts = _system_fonts_fingerprint()
+            return self._system_fonts
+
+    def pil_font(self, size: int, path: str | Path | None = None) -> ImageFont.ImageFont:
+        if path is None:
+            ttf = self.fonts()[1]
+            path = ttf if ttf and ttf.exists() else "DejaVuSans.ttf"
+        key = (str(path), int(size))
+        with self._lock:
+            font = self._pil_fonts.get(key)
+        if font is not None:
+            return font
+        try:
+            font = ImageFont.truetype(key[0], size=key[1])
+        except Exception:
+            font = ImageFont.load_default()
+        with self._lock:
+            self.stats["pil_fonts"] += 1
+            return self._pil_fonts.setdefault(key, font)
+
+    def reset(self) -> None:
+        # fonts dropped into assets or an office suite installed while the app is running
+        with _fonts_lock, self._lock:
+            self._fonts = None
+            self._soffice = None
+            self._soffice_known = False
+            self._system_fonts = None
+            self._pil_fonts.clear()
+
+
+_context: Optional[ConverterContext] = None
+_context_lock = threading.Lock()
+
+
+def get_converter_context() -> ConverterContext:
+    global _context
+    with _context_lock:
+        if _context is None:
+            _context = ConverterContext()
+        return _context
+
+
 def _run_soffice_to_pdf(input_path: Path, out_pdf: Path, filter_name: Optional[str] = None, timeout: int = 300) -> bool:
     exe = _find_soffice()
     if not exe:
         return False
-    out_dir = out_pdf.parent
-    out_dir.mkdir(parents=True, exist_ok=True)
-    arg_filter = f"pdf:{filter_name}" if filter_name else "pdf"
-    cmd = [exe, "--headless", "--norestore", "--convert-to", arg_filter, "--outdir", str(out_dir), str(input_path)]
     try:
-        subprocess.run(cmd, check=True, timeout=timeout, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        get_pool(exe).convert(input_path, out_pdf, filter_name, timeout=timeout)
     except Exception:
         return False
-    produced = out_dir / (input_path.stem + ".pdf")
-    if produced.exists():
-        if out_pdf.exists():
-            out_pdf.unlink(missing_ok=True)
-        produced.replace(out_pdf)
+    return out_pdf.exists()
+
+
+def _com_init() -> bool:
+    # merges convert inputs on worker threads, and COM must be initialized per thread
+    try:
+        import pythoncom  # type: ignore
+        pythoncom.CoInitialize()
         return True
-    return False
+    except Exception:
+        return False
+
+
+def _com_uninit(inited: bool) -> None:
+    if inited:
+        try:
+            import pythoncom  # type: ignore
+            pythoncom.CoUninitialize()
+        except Exception:
+            pass
 
 
 def _try_word_docx_to_pdf(docx_path: Path, out_pdf: Path) -> bool:
@@ -130,6 +296,7 @@ def _try_word_docx_to_pdf(docx_path: Path, out_pdf: Path) -> bool:
     except Exception:
         return False
     word = None
+    com = _com_init()
     try:
         word = win32com.client.DispatchEx("Word.Application")
         word.Visible = False
@@ -158,6 +325,7 @@ def _try_word_docx_to_pdf(docx_path: Path, out_pdf: Path) -> bool:
                 word.Quit()
         except Exception:
             pass
+        _com_uninit(com)
 
 
 def _try_excel_xlsx_to_pdf(xlsx_path: Path, out_pdf: Path) -> bool:
@@ -166,6 +334,7 @@ def _try_excel_xlsx_to_pdf(xlsx_path: Path, out_pdf: Path) -> bool:
     except Exception:
         return False
     excel = None
+    com = _com_init()
     try:
         excel = win32com.client.DispatchEx("Excel.Application")
         excel.Visible = False
@@ -181,6 +350,7 @@ def _try_excel_xlsx_to_pdf(xlsx_path: Path, out_pdf: Path) -> bool:
                 excel.Quit()
         except Exception:
             pass
+        _com_uninit(com)
 
 
 def _try_pptx_to_pdf_via_powerpoint(pptx_path: Path, out_pdf: Path) -> bool:
@@ -189,6 +359,7 @@ def _try_pptx_to_pdf_via_powerpoint(pptx_path: Path, out_pdf: Path) -> bool:
     except Exception:
         return False
     app = None
+    com = _com_init()
     try:
         app = win32com.client.DispatchEx("PowerPoint.Application")
         app.Visible = True
@@ -204,16 +375,21 @@ def _try_pptx_to_pdf_via_powerpoint(pptx_path: Path, out_pdf: Path) -> bool:
                 app.Quit()
         except Exception:
             pass
+        _com_uninit(com)
 
 
-def docx_to_pdf_basic(docx_path: str | Path, out_pdf: str | Path) -> str:
+def docx_to_pdf_basic(docx_path: str | Path, out_pdf: str | Path, report: Optional[dict] = None) -> str:
     src = Path(docx_path)
     dst = Path(out_pdf)
     dst.parent.mkdir(parents=True, exist_ok=True)
+    report = report if report is not None else {}
     if _try_word_docx_to_pdf(src, dst):
+        report["backend"] = "msoffice"
         return str(dst)
     if _run_soffice_to_pdf(src, dst, "writer_pdf_Export"):
+        report["backend"] = "soffice"
         return str(dst)
+    report["backend"] = "basic"
     family, _ = _ensure_fonts()
     css = _fallback_css(family)
     with open(src, "rb") as f:
@@ -229,14 +405,18 @@ def docx_to_pdf_basic(docx_path: str | Path, out_pdf: str | Path) -> str:
     return str(dst)
 
 
-def xlsx_to_pdf_basic(xlsx_path: str | Path, out_pdf: str | Path) -> str:
+def xlsx_to_pdf_basic(xlsx_path: str | Path, out_pdf: str | Path, report: Optional[dict] = None) -> str:
     src = Path(xlsx_path)
     dst = Path(out_pdf)
     dst.parent.mkdir(parents=True, exist_ok=True)
+    report = report if report is not None else {}
     if _try_excel_xlsx_to_pdf(src, dst):
+        report["backend"] = "msoffice"
         return str(dst)
     if _run_soffice_to_pdf(src, dst, "calc_pdf_Export"):
+        report["backend"] = "soffice"
         return str(dst)
+    report["backend"] = "basic"
     family, _ = _ensure_fonts()
     css = _fallback_css(family)
     xls = pd.ExcelFile(src)
@@ -288,10 +468,8 @@ def _render_textframe(draw, shape, dpi: int, pil_font_regular: ImageFont.FreeTyp
             if not txt.strip():
                 continue
             sz_pt = next((float(r.font.size.pt) for r in runs if getattr(r.font, "size", None)), 18.0)
-            try:
-                font = ImageFont.truetype(pil_font_regular.path, _pt_to_px(sz_pt, dpi))  # type: ignore[attr-defined]
-            except Exception:
-                font = pil_font_regular
+            path = getattr(pil_font_regular, "path", None)
+            font = get_converter_context().pil_font(_pt_to_px(sz_pt, dpi), path) if path else pil_font_regular
             draw.multiline_text((l + 6, y + 4), txt, fill=(0, 0, 0), font=font)
             y += getattr(font, "size", 14) + 6
     except Exception:
@@ -395,22 +573,19 @@ def _render_one(canvas, draw, shape, dpi: int, pil_font_regular: ImageFont.FreeT
         pass
 
 
-def pptx_to_pdf_basic(pptx_path: str | Path, out_pdf: str | Path, dpi: int = 150) -> str:
+def pptx_to_pdf_basic(pptx_path: str | Path, out_pdf: str | Path, dpi: int = 150, report: Optional[dict] = None) -> str:
     src = Path(pptx_path)
     dst = Path(out_pdf)
     dst.parent.mkdir(parents=True, exist_ok=True)
+    report = report if report is not None else {}
     if _try_pptx_to_pdf_via_powerpoint(src, dst):
+        report["backend"] = "msoffice"
         return str(dst)
     if _run_soffice_to_pdf(src, dst, "impress_pdf_Export"):
+        report["backend"] = "soffice"
         return str(dst)
-    _, pil_ttf = _ensure_fonts()
-    if pil_ttf and Path(pil_ttf).exists():
-        pil_font = ImageFont.truetype(str(pil_ttf), size=max(12, dpi // 11))
-    else:
-        try:
-            pil_font = ImageFont.truetype("DejaVuSans.ttf", size=max(12, dpi // 11))
-        except Exception:
-            pil_font = ImageFont.load_default()
+    report["backend"] = "basic"
+    pil_font = get_converter_context().pil_font(max(12, dpi // 11))
     prs = Presentation(str(src))
     page_w_px = _emu_to_px(int(prs.slide_width), dpi)
     page_h_px = _emu_to_px(int(prs.slide_height), dpi)
@@ -433,4 +608,4 @@ def pptx_to_pdf_basic(pptx_path: str | Path, out_pdf: str | Path, dpi: int = 150
     return str(dst)
 
 
-__all__ = ["docx_to_pdf_basic", "xlsx_to_pdf_basic", "pptx_to_pdf_basic"]
+__all__ = ["docx_to_pdf_basic", "xlsx_to_pdf_basic", "pptx_to_pdf_basic", "converter_fingerprint", "get_converter_context"]
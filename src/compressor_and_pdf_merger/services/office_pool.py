@@ -0,0 +1,307 @@
+from __future__ import annotations
+from pathlib import Path
+from typing import Optional
+import atexit
+import multiprocessing
+import os
+import queue
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from multiprocessing import util as mp_util
+
+_FILTERS = {
+    ".doc": "writer_pdf_Export", ".docx": "writer_pdf_Export", ".odt": "writer_pdf_Export", ".rtf": "writer_pdf_Export",
+    ".xls": "calc_pdf_Export", ".xlsx": "calc_pdf_Export", ".ods": "calc_pdf_Export",
+    ".ppt": "impress_pdf_Export", ".pptx": "impress_pdf_Export", ".odp": "impress_pdf_Export",
+}
+
+_uno = None
+_uno_checked = False
+_uno_lock = threading.Lock()
+
+
+def _load_uno(exe: str):
+    global _uno, _uno_checked
+    with _uno_lock:
+        if _uno_checked:
+            return _uno
+        _uno_checked = True
+        try:
+            import uno  # type: ignore
+        except Exception:
+            # Windows builds ship pyuno next to soffice.exe; it only loads if the Python versions match
+            program_dir = str(Path(exe).resolve().parent)
+            if program_dir not in sys.path:
+                sys.path.append(program_dir)
+            try:
+                import uno  # type: ignore
+            except Exception:
+                sys.path.remove(program_dir)
+                return None
+        _uno = uno
+        return _uno
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _props(uno, **kw):
+    out = []
+    for k, v in kw.items():
+        p = uno.createUnoStruct("com.sun.star.beans.PropertyValue")
+        p.Name = k
+        p.Value = v
+        out.append(p)
+    return tuple(out)
+
+
+class _Instance:
+    def __init__(self, exe: str, profile: Path, uno):
+        self.exe = exe
+        self.profile = profile
+        self.uno = uno
+        self.proc: Optional[subprocess.Popen] = None
+        self.desktop = None
+        self.jobs = 0
+
+    def _base_cmd(self) -> list[str]:
+        return [self.exe, "--headless", "--invisible", "--nologo", "--norestore", "--nolockcheck", "--nodefault", f"-env:UserInstallation={self.profile.as_uri()}"]
+
+    def start(self, timeout: float = 60.0) -> None:
+        self.stop()
+        if self.uno is None:
+            return
+        port = _free_port()
+        conn = f"socket,host=127.0.0.1,port={port};urp;StarOffice.ComponentContext"
+        self.proc = subprocess.Popen(self._base_cmd() + [f"--accept={conn}"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        local = self.uno.getComponentContext()
+        resolver = local.ServiceManager.createInstanceWithContext("com.sun.star.bridge.UnoUrlResolver", local)
+        deadline = time.monotonic() + timeout
+        while True:
+            if self.proc.poll() is not None:
+                raise RuntimeError(f"LibreOffice завершился при запуске (код {self.proc.returncode})")
+            try:
+                ctx = resolver.resolve(f"uno:{conn}")
+                break
+            except Exception:
+                if time.monotonic() > deadline:
+                    self.stop()
+                    raise RuntimeError("LibreOffice не ответил на подключение")
+                time.sleep(0.25)
+        self.desktop = ctx.ServiceManager.createInstanceWithContext("com.sun.star.frame.Desktop", ctx)
+
+    def healthy(self) -> bool:
+        if self.uno is None:
+            return True
+        if self.proc is None or self.proc.poll() is not None or self.desktop is None:
+            return False
+        try:
+            self.desktop.getComponents()
+            return True
+        except Exception:
+            return False
+
+    def convert(self, src: Path, out_pdf: Path, filter_name: str, timeout: float) -> None:
+        if self.uno is None:
+            self._convert_cli(src, out_pdf, filter_name, timeout)
+        else:
+            self._convert_uno(src, out_pdf, filter_name)
+        self.jobs += 1
+
+    def _convert_uno(self, src: Path, out_pdf: Path, filter_name: str) -> None:
+        doc = self.desktop.loadComponentFromURL(src.resolve().as_uri(), "_blank", 0, _props(self.uno, Hidden=True, ReadOnly=True))
+        if doc is None:
+            raise RuntimeError(f"LibreOffice не смог открыть {src.name}")
+        try:
+            doc.storeToURL(out_pdf.resolve().as_uri(), _props(self.uno, FilterName=filter_name))
+        finally:
+            try:
+                doc.close(True)
+            except Exception:
+                doc.dispose()
+
+    def _convert_cli(self, src: Path, out_pdf: Path, filter_name: str, timeout: float) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            cmd = self._base_cmd() + ["--convert-to", f"pdf:{filter_name}", "--outdir", tmp, str(src)]
+            self.proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            try:
+                self.proc.wait(timeout=timeout)
+            finally:
+                self.stop()
+            produced = Path(tmp) / (src.stem + ".pdf")
+            if not produced.exists():
+                raise RuntimeError(f"LibreOffice не создал PDF для {src.name}")
+            out_pdf.unlink(missing_ok=True)
+            os.replace(produced, out_pdf)
+
+    def kill(self) -> None:
+        self.desktop = None
+        if self.proc is not None and self.proc.poll() is None:
+            self.proc.kill()
+            self.proc.wait()
+
+    def stop(self) -> None:
+        if self.desktop is not None:
+            try:
+                self.desktop.terminate()
+            except Exception:
+                pass
+            self.desktop = None
+        if self.proc is not None:
+            if self.proc.poll() is None:
+                self.proc.terminate()
+                try:
+                    self.proc.wait(timeout=5)
+                except subprocess.TimeoutExpired:
+                    self.proc.kill()
+                    self.proc.wait()
+            self.proc = None
+
+
+class OfficePool:
+    def __init__(self, exe: str, size: int = 2, profile_root: Optional[Path] = None):
+        self.exe = exe
+        self.size = max(1, int(size))
+        # a forked child inherits this object, but the soffice processes and profiles belong to the creator
+        self.pid = os.getpid()
+        self.profile_root = Path(profile_root) if profile_root else Path(tempfile.gettempdir()) / f"cpm_soffice_{os.getpid()}"
+        self.uno = _load_uno(exe)
+        self._idle: queue.Queue[_Instance] = queue.Queue()
+        for i in range(self.size):
+            self._idle.put(_Instance(exe, self.profile_root / f"profile{i}", self.uno))
+        self._closed = False
+        self.stats = {"jobs": 0, "restarts": 0, "timeouts": 0, "failures": 0}
+        self._stats_lock = threading.Lock()
+
+    @property
+    def mode(self) -> str:
+        return "uno" if self.uno is not None else "cli"
+
+    def _count(self, key: str) -> None:
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def _run(self, inst: _Instance, src: Path, out_pdf: Path, filter_name: str, timeout: float) -> None:
+        if self.uno is None:
+            try:
+                inst.convert(src, out_pdf, filter_name, timeout)
+            except subprocess.TimeoutExpired:
+                self._count("timeouts")
+                raise TimeoutError(f"LibreOffice: превышено время конвертации {src.name}")
+            return
+        # a UNO call cannot be interrupted, so the job runs in a helper thread and the instance is killed on timeout
+        err: list[BaseException] = []
+
+        def job() -> None:
+            try:
+                inst.convert(src, out_pdf, filter_name, timeout)
+            except BaseException as e:
+                err.append(e)
+
+        t = threading.Thread(target=job, daemon=True)
+        t.start()
+        t.join(timeout)
+        if t.is_alive():
+            self._count("timeouts")
+            inst.kill()
+            t.join(5)
+            raise TimeoutError(f"LibreOffice: превышено время конвертации {src.name}")
+        if err:
+            raise err[0]
+
+    def convert(self, src: str | Path, out_pdf: str | Path, filter_name: Optional[str] = None, timeout: float = 300) -> None:
+        if self._closed:
+            raise RuntimeError("Пул LibreOffice остановлен")
+        src = Path(src)
+        out_pdf = Path(out_pdf)
+        out_pdf.parent.mkdir(parents=True, exist_ok=True)
+        filter_name = filter_name or _FILTERS.get(src.suffix.lower(), "writer_pdf_Export")
+        inst = self._idle.get()
+        try:
+            for attempt in range(2):
+                if not inst.healthy():
+                    if inst.proc is not None:
+                        self._count("restarts")
+                    inst.start()
+                try:
+                    self._run(inst, src, out_pdf, filter_name, timeout)
+                    self._count("jobs")
+                    return
+                except TimeoutError:
+                    raise
+                except Exception:
+                    # a crashed instance is restarted and the job retried once
+                    if attempt or inst.healthy():
+                        self._count("failures")
+                        raise
+        finally:
+            self._idle.put(inst)
+
+    def shutdown(self) -> None:
+        if os.getpid() != self.pid:
+            return
+        self._closed = True
+        while True:
+            try:
+                inst = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            inst.stop()
+        shutil.rmtree(self.profile_root, ignore_errors=True)
+
+
+_pool: Optional[OfficePool] = None
+_pool_lock = threading.Lock()
+_finalizer_pid: Optional[int] = None
+
+
+def _default_size() -> int:
+    # a worker process of a ProcessPoolExecutor converts one file at a time; the parallelism is the number of workers
+    if multiprocessing.parent_process() is not None:
+        return 1
+    return max(1, min(4, os.cpu_count() or 1))
+
+
+def _forget_inherited_pool() -> None:
+    # runs in a forked child: the parent's pool is left alone, the child starts its own on first use
+    global _pool, _pool_lock, _finalizer_pid
+    _pool = None
+    _pool_lock = threading.Lock()
+    _finalizer_pid = None
+
+
+def get_pool(exe: str, size: Optional[int] = None) -> OfficePool:
+    global _pool, _finalizer_pid
+    with _pool_lock:
+        if _finalizer_pid != os.getpid():
+            # atexit hooks never run in multiprocessing workers, their finalizers do; without this the listeners outlive the worker
+            mp_util.Finalize(None, shutdown_pool, exitpriority=10)
+            _finalizer_pid = os.getpid()
+        if _pool is not None and _pool.pid != os.getpid():
+            _pool = None
+        if _pool is None or _pool.exe != exe or _pool._closed:
+            if _pool is not None:
+                _pool.shutdown()
+            _pool = OfficePool(exe, size=size or _default_size())
+        return _pool
+
+
+def shutdown_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
+
+
+atexit.register(shutdown_pool)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_inherited_pool)
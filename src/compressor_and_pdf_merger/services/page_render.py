@@ -0,0 +1,52 @@
+from __future__ import annotations
+from collections import OrderedDict
+from typing import Optional
+import threading
+import fitz
+
+# a display list holds the page's decoded content: ~0.1 MB for vector pages, but a scanned page keeps
+# its full image (tens of MB), so a cache lives only as long as one job and holds a handful of pages
+DEFAULT_MAX_LISTS = 4
+
+
+class DisplayListCache:
+    # one job, one document: a page's content stream is interpreted once; renders at other DPIs,
+    # colorspaces or clips replay the list. Create it per call and let it go when the call returns
+    def __init__(self, max_items: int = DEFAULT_MAX_LISTS):
+        self.max_items = max(1, int(max_items))
+        self.stats = {"hits": 0, "misses": 0}
+        self._lists: OrderedDict[tuple, fitz.DisplayList] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, page: fitz.Page) -> fitz.DisplayList:
+        key = (page.number, page.rotation)
+        with self._lock:
+            if key in self._lists:
+                self._lists.move_to_end(key)
+                self.stats["hits"] += 1
+                return self._lists[key]
+            self.stats["misses"] += 1
+        dl = page.get_displaylist()
+        with self._lock:
+            self._lists[key] = dl
+            while len(self._lists) > self.max_items:
+                self._lists.popitem(last=False)
+        return dl
+
+    def clear(self) -> None:
+        with self._lock:
+            self._lists.clear()
+
+
+def render_page(
+    page: fitz.Page,
+    *,
+    dpi: float = 72,
+    colorspace: fitz.Colorspace = fitz.csRGB,
+    clip: Optional[fitz.Rect] = None,
+    cache: Optional[DisplayListCache] = None,
+) -> fitz.Pixmap:
+    mat = fitz.Matrix(dpi / 72.0, dpi / 72.0)
+    if cache is None:
+        return page.get_pixmap(matrix=mat, colorspace=colorspace, alpha=False, clip=clip)
+    return cache.get(page).get_pixmap(matrix=mat, colorspace=colorspace, alpha=False, clip=clip)
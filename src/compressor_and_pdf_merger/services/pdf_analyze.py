@@ -0,0 +1,258 @@
+from __future__ import annotations
+from collections import defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+import hashlib
+import math
+import re
+import fitz
+import pikepdf
+from pikepdf import Array, Dictionary, Name, Stream
+
+_SUBSET_RE = re.compile(r"^/?[A-Z]{6}\+")
+_FONT_FILE_KEYS = ("/FontFile", "/FontFile2", "/FontFile3")
+_BITONAL_FILTERS = {"CCITTFaxDecode", "JBIG2Decode"}
+
+
+@dataclass
+class PdfBudget:
+    file_size: int
+    page_count: int
+    categories: dict[str, int] = field(default_factory=dict)
+    images: dict[str, int] = field(default_factory=dict)
+    fonts: dict[str, int] = field(default_factory=dict)
+    duplicates: int = 0
+    pages: list[dict[str, int]] = field(default_factory=list)
+    recommended_mode: str = "lossless"
+    reason: str = ""
+
+
+def _length(obj: Stream) -> int:
+    try:
+        return int(obj.get("/Length", 0))
+    except Exception:
+        return 0
+
+
+def _filter_name(obj: Stream) -> str:
+    f = obj.get("/Filter")
+    if isinstance(f, Array):
+        f = f[len(f) - 1] if len(f) else None
+    return str(f).lstrip("/") if f is not None else "raw"
+
+
+def _dpi_bucket(dpi: float | None, estimated: bool = False) -> str:
+    if dpi is None:
+        return "? dpi"
+    if dpi <= 100:
+        label = "≤100 dpi"
+    elif dpi <= 200:
+        label = "100–200 dpi"
+    elif dpi <= 300:
+        label = "200–300 dpi"
+    else:
+        label = ">300 dpi"
+    return f"{label} (оценка)" if estimated else label
+
+
+def _placements(src: Path, pages: list[int]) -> dict[int, tuple[float, float]]:
+    # smallest drawn size in points of every image xref, taken from its placement matrix (cm) in the content stream
+    out: dict[int, tuple[float, float]] = {}
+    with fitz.open(src) as doc:
+        for pno in pages:
+            page = doc[pno]
+            by_size: dict[tuple[int, int], list[int]] = defaultdict(list)
+            for item in page.get_images(full=True):
+                by_size[(item[2], item[3])].append(item[0])
+            for info in page.get_image_info():
+                a, b, c, d = info["transform"][:4]
+                sx, sy = math.hypot(a, b), math.hypot(c, d)
+                if sx <= 0 or sy <= 0:
+                    continue
+                # inline images have no xref; same-sized images of one page share the smallest placement
+                for xref in by_size.get((info["width"], info["height"]), ()):
+                    px, py = out.get(xref, (sx, sy))
+                    out[xref] = (min(px, sx), min(py, sy))
+    return out
+
+
+def _image_dpi(obj: Stream, placed: tuple[float, float]) -> float:
+    sx, sy = placed
+    return min(int(obj.get("/Width", 0)) * 72.0 / sx, int(obj.get("/Height", 0)) * 72.0 / sy)
+
+
+def _font_files(font: pikepdf.Object) -> list[tuple[pikepdf.Object, str]]:
+    out = []
+    fonts = [font]
+    desc = font.get("/DescendantFonts")
+    if isinstance(desc, Array):
+        fonts.extend(desc)
+    for f in fonts:
+        fd = f.get("/FontDescriptor")
+        if not isinstance(fd, Dictionary):
+            continue
+        for k in _FONT_FILE_KEYS:
+            ff = fd.get(k)
+            if isinstance(ff, Stream):
+                out.append((ff, str(fd.get("/FontName", ""))))
+    return out
+
+
+def _walk_resources(res, seen: set, acc: dict[str, int], est_of: dict, mask_of: dict, page_area_pt: float) -> None:
+    if not isinstance(res, Dictionary):
+        return
+    fonts = res.get("/Font")
+    if isinstance(fonts, Dictionary):
+        for _, font in fonts.items():
+            if not isinstance(font, Dictionary):
+                continue
+            for ff, _ in _font_files(font):
+                if ff.objgen not in seen:
+                    seen.add(ff.objgen)
+                    acc["fonts"] += _length(ff)
+    xobjs = res.get("/XObject")
+    if not isinstance(xobjs, Dictionary):
+        return
+    for _, xo in xobjs.items():
+        if not isinstance(xo, Stream) or xo.objgen in seen:
+            continue
+        seen.add(xo.objgen)
+        sub = xo.get("/Subtype")
+        if sub == Name.Image:
+            acc["images"] += _length(xo)
+            for k in ("/SMask", "/Mask"):
+                m = xo.get(k)
+                if isinstance(m, Stream):
+                    # masks are never drawn on their own: they take the placement of the image they belong to
+                    mask_of[m.objgen] = xo.objgen[0]
+                    if m.objgen not in seen:
+                        seen.add(m.objgen)
+                        acc["images"] += _length(m)
+            if page_area_pt > 0:
+                # fallback for images fitz cannot place: assume the image covers the whole page
+                dpi = math.sqrt(int(xo.get("/Width", 0)) * int(xo.get("/Height", 0)) / page_area_pt) * 72.0
+                est_of[xo.objgen] = max(est_of.get(xo.objgen, 0.0), dpi)
+        elif sub == Name.Form:
+            acc["content"] += _length(xo)
+            _walk_resources(xo.get("/Resources"), seen, acc, est_of, mask_of, page_area_pt)
+
+
+def _duplicate_bytes(streams: list[Stream]) -> int:
+    groups: dict[tuple, list[Stream]] = defaultdict(list)
+    for s in streams:
+        n = _length(s)
+        if n >= 1024:
+            groups[(n, _filter_name(s), str(s.get("/Subtype", "")))].append(s)
+    dup = 0
+    for (n, _, _), members in groups.items():
+        if len(members) < 2:
+            continue
+        hashes: set[bytes] = set()
+        for s in members:
+            try:
+                h = hashlib.sha256(s.read_raw_bytes()).digest()
+            except Exception:
+                continue
+            if h in hashes:
+                dup += n
+            hashes.add(h)
+    return dup
+
+
+def _recommend(b: PdfBudget, scanned_pages: int, color_images: int, gray_images: int, bitonal_images: int, low_res_images: int) -> tuple[str, str]:
+    total = max(1, b.file_size)
+    img = b.categories.get("images", 0) / total
+    if b.duplicates / total >= 0.1:
+        return "lossless", "много повторяющихся объектов — поможет бережное сжатие"
+    if b.categories.get("fonts", 0) / total >= 0.3:
+        return "lossless", "основной объём — встроенные шрифты, их можно урезать без потерь"
+    if img < 0.5:
+        return "lossless", "изображений мало, растрирование не даст выигрыша"
+    if bitonal_images >= max(color_images, gray_images):
+        return "lossless", "страницы уже в 1-битном сжатии (CCITT/JBIG2)"
+    if low_res_images * 2 >= b.categories.get("images", 0):
+        return "lossless", "изображения уже в низком разрешении (≤150 dpi)"
+    if scanned_pages >= max(1, b.page_count // 2):
+        if color_images > gray_images:
+            return "mrc", "цветные сканы с текстом — MRC даст чёткий текст и маленький размер"
+        return "images", "серые сканы — растрирование с галочкой «Ч/Б страницы в 1 бит»"
+    return "images", "основной объём — изображения, растрирование уменьшит размер"
+
+
+def analyze_pdf(src_pdf: str | Path) -> PdfBudget:
+    src = Path(src_pdf)
+    with pikepdf.open(src) as pdf:
+        b = PdfBudget(file_size=src.stat().st_size, page_count=len(pdf.pages))
+        cats: dict[str, int] = defaultdict(int)
+        images: dict[str, int] = defaultdict(int)
+        fonts: dict[str, int] = defaultdict(int)
+        est_of: dict[tuple[int, int], float] = {}
+        mask_of: dict[tuple[int, int], int] = {}
+        image_pages: list[int] = []
+        content_ids: set[tuple[int, int]] = set()
+        scanned_pages = 0
+
+        for page in pdf.pages:
+            acc: dict[str, int] = defaultdict(int)
+            contents = page.obj.get("/Contents")
+            for c in (contents if isinstance(contents, Array) else [contents]):
+                if isinstance(c, Stream):
+                    content_ids.add(c.objgen)
+                    acc["content"] += _length(c)
+            box = page.mediabox
+            area = abs(float(box[2]) - float(box[0])) * abs(float(box[3]) - float(box[1]))
+            _walk_resources(page.obj.get("/Resources"), set(), acc, est_of, mask_of, area)
+            if acc["images"]:
+                image_pages.append(len(b.pages))
+            if acc["images"] and acc["content"] < 4096 and acc["fonts"] == 0:
+                scanned_pages += 1
+            b.pages.append({"content": acc["content"], "images": acc["images"], "fonts": acc["fonts"]})
+
+        font_ids: dict[tuple[int, int], str] = {}
+        for obj in pdf.objects:
+            if isinstance(obj, Dictionary) and obj.get("/Type") == Name.FontDescriptor:
+                for k in _FONT_FILE_KEYS:
+                    ff = obj.get(k)
+                    if isinstance(ff, Stream):
+                        font_ids[ff.objgen] = str(obj.get("/FontName", ""))
+
+        placed = _placements(src, image_pages) if image_pages else {}
+        streams: list[Stream] = []
+        color_images = gray_images = bitonal_images = low_res_images = 0
+        for obj in pdf.objects:
+            if not isinstance(obj, Stream):
+                continue
+            streams.append(obj)
+            n = _length(obj)
+            if obj.objgen in font_ids:
+                cats["fonts"] += n
+                fonts["subset" if _SUBSET_RE.match(font_ids[obj.objgen]) else "embedded"] += n
+            elif obj.get("/Subtype") == Name.Image:
+                cats["images"] += n
+                filt = _filter_name(obj)
+                where = placed.get(mask_of.get(obj.objgen, obj.objgen[0]))
+                dpi = _image_dpi(obj, where) if where else est_of.get(obj.objgen)
+                images[f"{filt}, {_dpi_bucket(dpi, estimated=where is None)}"] += n
+                # an estimate cannot tell a small logo from a low-res scan, so only measured placements count
+                if where is not None and dpi <= 150:
+                    low_res_images += n
+                if filt in _BITONAL_FILTERS or obj.get("/BitsPerComponent") == 1:
+                    bitonal_images += n
+                elif obj.get("/ColorSpace") in (Name.DeviceGray, None):
+                    gray_images += n
+                else:
+                    color_images += n
+            elif obj.get("/Type") == Name.Metadata:
+                cats["metadata"] += n
+            elif obj.objgen in content_ids or obj.get("/Subtype") == Name.Form:
+                cats["content"] += n
+            else:
+                cats["other streams"] += n
+
+        b.duplicates = _duplicate_bytes(streams)
+        cats["structure"] = max(0, b.file_size - sum(cats.values()))
+        b.categories = dict(cats)
+        b.images = dict(sorted(images.items(), key=lambda kv: -kv[1]))
+        b.fonts = dict(fonts)
+        b.recommended_mode, b.reason = _recommend(b, scanned_pages, color_images, gray_images, bitonal_images, low_res_images)
+        return b
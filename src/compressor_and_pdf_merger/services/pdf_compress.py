@@ -1,36 +1,19 @@
 from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
+from collections import deque
+from dataclasses import dataclass, replace
+from itertools import islice
 from pathlib import Path
-import io, os, shutil
+from typing import Callable, Iterable, Iterator
+import io, os, shutil, sys, threading, zlib
 import fitz
+import numpy as np
 from PIL import Image, ImageOps
 import pikepdf
-from .pdf_utils import tmp_path
-
-
-def _safe_strip_metadata(pdf: pikepdf.Pdf, also_names: bool = True) -> None:
-    try:
-        di = getattr(pdf, "docinfo", None)
-        if di:
-            for k in list(di.keys()):
-                try:
-                    del di[k]
-                except Exception:
-                    pass
-        if "/Info" in pdf.trailer:
-            pdf.trailer["/Info"] = pikepdf.Dictionary()
-    except Exception:
-        pass
-    try:
-        if "/Metadata" in pdf.Root:
-            del pdf.Root["/Metadata"]
-    except Exception:
-        pass
-    if also_names:
-        try:
-            if "/Names" in pdf.Root:
-                del pdf.Root["/Names"]
-        except Exception:
-            pass
+from .pdf_utils import tmp_path, rss_mb, check_cancel, default_workers, stop_pool, worker_init, worker_source, OperationCancelled, _safe_strip_metadata
+from .pdf_optimize import first_page_ready, linearize_pdf, optimize_pdf_lossless, verify_linearized
+from .text_index import index_pdf
+from .page_render import DisplayListCache, render_page
 
 
 def _flatten_to_rgb(im: Image.Image, grayscale: bool) -> Image.Image:
@@ -53,34 +36,399 @@ def _jpeg_bytes(im: Image.Image, quality: int) -> bytes:
     return bio.getvalue()
 
 
-def _rasterize_pdf(src_pdf: str | Path, out_pdf: str | Path, dpi: int, quality: int, grayscale: bool, strip_metadata: bool) -> None:
-    src = fitz.open(str(src_pdf))
-    out = fitz.open()
-    scale = dpi / 72.0
-    mat = fitz.Matrix(scale, scale)
-    cs = fitz.csGRAY if grayscale else fitz.csRGB
-    for p in src:
-        rect = p.rect
-        pix = p.get_pixmap(matrix=mat, colorspace=cs, alpha=False)
-        mode = "L" if grayscale else "RGB"
+@dataclass
+class RasterOptions:
+    dpi: int = 144
+    quality: int = 75
+    grayscale: bool = False
+    auto_gray: bool = True
+    bitonal: bool = False
+    bitonal_dpi: int = 300
+    mrc: bool = False
+
+
+@dataclass
+class _EncodedPage:
+    pno: int
+    width: float
+    height: float
+    kind: str  # "jpeg" | "ccitt" | "flate1" | "mrc"
+    data: bytes
+    px_w: int = 0
+    px_h: int = 0
+    params: str = ""
+    mask: bytes = b""
+    mask_w: int = 0
+    mask_h: int = 0
+    mask_params: str = ""
+    fg: tuple[int, int, int] = (0, 0, 0)
+    gray: bool = False
+    rss_mb: float | None = None
+
+
+def _otsu_threshold(gray: np.ndarray) -> int:
+    hist = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+    w0 = np.cumsum(hist)
+    mu0 = np.cumsum(hist * np.arange(256))
+    total, mt = w0[-1], mu0[-1]
+    w1 = total - w0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        between = (mt * w0 - mu0 * total) ** 2 / (w0 * w1)
+    return int(np.nanargmax(np.nan_to_num(between, nan=-1.0)))
+
+
+def _is_bitonal(arr: np.ndarray, mid_tol: float = 0.02, chroma_tol: int = 24) -> bool:
+    if arr.shape[2] >= 3:
+        r, g, b = arr[..., 0], arr[..., 1], arr[..., 2]
+        chroma = np.maximum(np.maximum(r, g), b) - np.minimum(np.minimum(r, g), b)
+        if np.count_nonzero(chroma > chroma_tol) > chroma.size * mid_tol:
+            return False
+        gray = g
+    else:
+        gray = arr[..., 0]
+    mid = np.count_nonzero((gray > 64) & (gray < 192))
+    return mid <= gray.size * mid_tol
+
+
+def _has_color(arr: np.ndarray, chroma_tol: int = 32, min_fraction: float = 0.001) -> bool:
+    r, g, b = arr[..., 0], arr[..., 1], arr[..., 2]
+    chroma = np.maximum(np.maximum(r, g), b) - np.minimum(np.minimum(r, g), b)
+    return np.count_nonzero(chroma > chroma_tol) > max(4, chroma.size * min_fraction)
+
+
+def _page_is_gray(page: fitz.Page, preview_dpi: int = 24, cache: DisplayListCache | None = None) -> bool:
+    pix = render_page(page, dpi=preview_dpi, colorspace=fitz.csRGB, cache=cache)
+    return not _has_color(_pixmap_array(pix))
+
+
+def _pixmap_array(pix: fitz.Pixmap) -> np.ndarray:
+    return np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width, pix.n)
+
+
+def _ccitt_g4(im: Image.Image) -> tuple[bytes, str] | None:
+    bio = io.BytesIO()
+    try:
+        im.save(bio, format="TIFF", compression="group4", strip_size=2**31 - 1)
+        with Image.open(io.BytesIO(bio.getvalue())) as t:
+            offsets = t.tag_v2[273]
+            counts = t.tag_v2[279]
+            photometric = t.tag_v2.get(262, 0)
+    except Exception:
+        return None
+    if len(offsets) != 1:
+        return None
+    raw = bio.getvalue()
+    blk = "true" if photometric == 1 else "false"
+    params = f"/Filter/CCITTFaxDecode/DecodeParms<</K -1/Columns {im.width}/Rows {im.height}/BlackIs1 {blk}>>"
+    return raw[offsets[0]:offsets[0] + counts[0]], params
+
+
+def _mask_stream(mask: np.ndarray) -> tuple[bytes, str]:
+    g4 = _ccitt_g4(Image.fromarray(mask))
+    if g4 is not None:
+        return g4
+    return zlib.compress(np.packbits(mask, axis=1).tobytes(), 9), "/Filter/FlateDecode"
+
+
+def _encode_bitonal(page: fitz.Page, pno: int, opts: RasterOptions, cache: DisplayListCache | None = None) -> _EncodedPage:
+    rect = page.rect
+    pix = render_page(page, dpi=max(opts.dpi, opts.bitonal_dpi), colorspace=fitz.csGRAY, cache=cache)
+    gray = _pixmap_array(pix)[..., 0]
+    im = Image.fromarray(gray > _otsu_threshold(gray))
+    g4 = _ccitt_g4(im)
+    if g4 is not None:
+        data, params = g4
+        return _EncodedPage(pno, rect.width, rect.height, "ccitt", data, im.width, im.height, params)
+    bio = io.BytesIO()
+    im.save(bio, format="PNG", optimize=True)
+    return _EncodedPage(pno, rect.width, rect.height, "flate1", bio.getvalue(), im.width, im.height)
+
+
+def _block_view(a: np.ndarray, block: int) -> np.ndarray:
+    h, w = a.shape[:2]
+    bh, bw = -(-h // block), -(-w // block)
+    pad = [(0, bh * block - h), (0, bw * block - w)] + [(0, 0)] * (a.ndim - 2)
+    a = np.pad(a, pad, mode="edge")
+    return a.reshape((bh, block, bw, block) + a.shape[2:])
+
+
+def _expand_blocks(b: np.ndarray, block: int, shape: tuple[int, int]) -> np.ndarray:
+    return np.repeat(np.repeat(b, block, axis=0), block, axis=1)[: shape[0], : shape[1]]
+
+
+def _mrc_segment(rgb: np.ndarray, block: int = 16) -> tuple[np.ndarray, np.ndarray, tuple[int, int, int]]:
+    gray = ((rgb[..., 0].astype(np.uint16) * 77 + rgb[..., 1].astype(np.uint16) * 150 + rgb[..., 2].astype(np.uint16) * 29) >> 8).astype(np.uint8)
+    dark = gray < min(_otsu_threshold(gray), 160)
+    blocks = _block_view(gray, block)
+    bmax = blocks.max(axis=(1, 3))
+    bmin = blocks.min(axis=(1, 3))
+    text = (bmax > 192) & (bmax.astype(np.int16) - bmin > 96)
+    grown = text.copy()
+    grown[1:] |= text[:-1]
+    grown[:-1] |= text[1:]
+    grown[:, 1:] |= text[:, :-1]
+    grown[:, :-1] |= text[:, 1:]
+    mask = dark & _expand_blocks(grown, block, gray.shape)
+    if not mask.any():
+        return mask, rgb, (0, 0, 0)
+    fg = tuple(int(v) for v in rgb[mask].mean(axis=0))
+    keep = _block_view(~mask, block)
+    cnt = keep.sum(axis=(1, 3))
+    sums = (_block_view(rgb, block).astype(np.uint32) * keep[..., None]).sum(axis=(1, 3))
+    fill = np.where(cnt[..., None] > 0, sums // np.maximum(cnt, 1)[..., None], 255).astype(np.uint8)
+    bg = np.where(mask[..., None], _expand_blocks(fill, block, gray.shape), rgb)
+    return mask, bg, fg
+
+
+def _encode_mrc(page: fitz.Page, pno: int, opts: RasterOptions, cache: DisplayListCache | None = None) -> _EncodedPage:
+    rect = page.rect
+    pix = render_page(page, dpi=max(opts.dpi, opts.bitonal_dpi), colorspace=fitz.csRGB, cache=cache)
+    mask, bg, fg = _mrc_segment(_pixmap_array(pix))
+    bg_size = (max(1, round(rect.width * opts.dpi / 72.0)), max(1, round(rect.height * opts.dpi / 72.0)))
+    im = Image.fromarray(bg).resize(bg_size, Image.Resampling.BOX)
+    im = _flatten_to_rgb(im, opts.grayscale)
+    jpg = _jpeg_bytes(im, opts.quality)
+    if not mask.any():
+        return _EncodedPage(pno, rect.width, rect.height, "jpeg", jpg, im.width, im.height)
+    data, params = _mask_stream(mask)
+    if opts.grayscale:
+        fg = (round(sum(fg) / 3),) * 3
+    return _EncodedPage(pno, rect.width, rect.height, "mrc", jpg, im.width, im.height, "", data, mask.shape[1], mask.shape[0], params, fg)
+
+
+def _encode_page(doc: fitz.Document, pno: int, opts: RasterOptions) -> _EncodedPage:
+    page = doc.load_page(pno)
+    rect = page.rect
+    # the page is rendered up to three times; the display list lives only for this page
+    cache = DisplayListCache(max_items=1)
+    if not opts.grayscale and opts.auto_gray and _page_is_gray(page, cache=cache):
+        opts = replace(opts, grayscale=True)
+    cs = fitz.csGRAY if opts.grayscale else fitz.csRGB
+    # the bitonal test and the JPEG use this render; MRC makes its own at bitonal_dpi
+    pix = None if opts.mrc and not opts.bitonal else render_page(page, dpi=opts.dpi, colorspace=cs, cache=cache)
+    if opts.bitonal and _is_bitonal(_pixmap_array(pix)):
+        enc = _encode_bitonal(page, pno, opts, cache)
+    elif opts.mrc:
+        pix = None
+        enc = _encode_mrc(page, pno, opts, cache)
+    else:
+        mode = "L" if opts.grayscale else "RGB"
         im = Image.frombytes(mode, (pix.width, pix.height), pix.samples)
-        im = _flatten_to_rgb(im, grayscale)
-        jpg = _jpeg_bytes(im, quality)
-        new = out.new_page(width=rect.width, height=rect.height)
-        new.insert_image(rect, stream=jpg)
+        im = _flatten_to_rgb(im, opts.grayscale)
+        enc = _EncodedPage(pno, rect.width, rect.height, "jpeg", _jpeg_bytes(im, opts.quality), im.width, im.height)
+    enc.gray = opts.grayscale
+    return enc
+
+
+def _worker_encode(pno: int, opts: RasterOptions) -> _EncodedPage:
+    enc = _encode_page(worker_source(), pno, opts)
+    enc.rss_mb = rss_mb()
+    return enc
+
+
+def _raster_workers(workers: int | None, page_count: int) -> int:
+    n = default_workers() if workers is None else max(1, int(workers))
+    return min(n, page_count)
+
+
+def _raster_pool(src_pdf: str | Path, n: int) -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(max_workers=n, initializer=worker_init, initargs=(fitz.open, str(src_pdf)))
+
+
+def _encode_pages(
+    src_pdf: str | Path,
+    page_count: int,
+    opts: RasterOptions,
+    workers: int | None,
+    cancel: threading.Event | None = None,
+    executor: ProcessPoolExecutor | None = None,
+) -> Iterator[_EncodedPage]:
+    # an executor passed in outlives this call, so its workers keep their open documents between trials
+    n = _raster_workers(workers, page_count)
+    if n <= 1:
+        doc = fitz.open(str(src_pdf))
+        try:
+            for pno in range(page_count):
+                yield _encode_page(doc, pno, opts)
+        finally:
+            doc.close()
+        return
+    pnos = iter(range(page_count))
+    ex = executor or _raster_pool(src_pdf, n)
+    pending: deque = deque()
+    try:
+        pending.extend(ex.submit(_worker_encode, pno, opts) for pno in islice(pnos, n * 2))
+        while pending:
+            while not wait([pending[0]], timeout=0.2).done:
+                check_cancel(cancel)
+            enc = pending.popleft().result()
+            nxt = next(pnos, None)
+            if nxt is not None:
+                pending.append(ex.submit(_worker_encode, nxt, opts))
+            yield enc
+    finally:
+        if ex is not executor:
+            stop_pool(ex, pending)
+        else:
+            # abandoned early (cancel or error): the owner's pool stays up for the next trial
+            for f in pending:
+                f.cancel()
+
+
+def _raw_image_xobject(doc: fitz.Document, data: bytes, header: str) -> int:
+    xref = doc.get_new_xref()
+    doc.update_object(xref, "<<>>")
+    doc.update_stream(xref, data, compress=False)
+    doc.update_object(xref, f"<</Type/XObject/Subtype/Image{header}/Length {len(data)}>>")
+    return xref
+
+
+def _add_encoded_page(out: fitz.Document, enc: _EncodedPage) -> None:
+    new = out.new_page(width=enc.width, height=enc.height)
+    if enc.kind == "ccitt":
+        header = f"/Width {enc.px_w}/Height {enc.px_h}/BitsPerComponent 1/ColorSpace/DeviceGray{enc.params}"
+        new.insert_image(new.rect, xref=_raw_image_xobject(out, enc.data, header))
+        return
+    new.insert_image(new.rect, stream=enc.data)
+    if enc.kind == "mrc":
+        mask_xref = _raw_image_xobject(out, enc.mask, f"/Width {enc.mask_w}/Height {enc.mask_h}/ImageMask true/BitsPerComponent 1/Decode[1 0]{enc.mask_params}")
+        fg_header = f"/Width 1/Height 1/ColorSpace/DeviceRGB/BitsPerComponent 8/Mask {mask_xref} 0 R"
+        new.insert_image(new.rect, xref=_raw_image_xobject(out, bytes(enc.fg), fg_header))
+
+
+def _save_chunk(out: fitz.Document) -> Path:
     tmp = tmp_path(".pdf")
     out.save(str(tmp), deflate=True)
     out.close()
-    src.close()
-    if strip_metadata:
-        with pikepdf.open(tmp) as pdf:
-            _safe_strip_metadata(pdf, also_names=True)
-            pdf.save(str(out_pdf), compress_streams=True, object_stream_mode=pikepdf.ObjectStreamMode.generate)
-        Path(tmp).unlink(missing_ok=True)
-    else:
-        if Path(out_pdf).exists():
-            Path(out_pdf).unlink()
-        os.replace(tmp, out_pdf)
+    return tmp
+
+
+def _concat_chunks(chunks: list[Path], out_pdf: str | Path, strip_metadata: bool) -> None:
+    opened: list[pikepdf.Pdf] = []
+    try:
+        with pikepdf.new() as dst:
+            for c in chunks:
+                part = pikepdf.open(c)
+                opened.append(part)
+                dst.pages.extend(part.pages)
+            if strip_metadata:
+                _safe_strip_metadata(dst, also_names=True)
+            dst.save(str(out_pdf), compress_streams=True, object_stream_mode=pikepdf.ObjectStreamMode.generate)
+    finally:
+        for part in opened:
+            part.close()
+
+
+def _rasterize_pdf(
+    src_pdf: str | Path,
+    out_pdf: str | Path,
+    opts: RasterOptions,
+    *,
+    strip_metadata: bool,
+    workers: int | None = None,
+    memory_budget_mb: int = 256,
+    report: dict | None = None,
+    progress: Callable[[int, int], None] | None = None,
+    cancel: threading.Event | None = None,
+    executor: ProcessPoolExecutor | None = None,
+) -> None:
+    check_cancel(cancel)
+    with fitz.open(str(src_pdf)) as src:
+        page_count = len(src)
+    budget = max(1, int(memory_budget_mb)) * 1024 * 1024
+    chunks: list[Path] = []
+    out = fitz.open()
+    held = 0
+    peak = rss_mb() or 0.0
+    worker_peak = 0.0
+    gray_pages = 0
+    try:
+        for done, enc in enumerate(_encode_pages(src_pdf, page_count, opts, workers, cancel, executor), start=1):
+            check_cancel(cancel)
+            _add_encoded_page(out, enc)
+            gray_pages += enc.gray
+            if progress is not None:
+                progress(done, page_count)
+            held += len(enc.data) + len(enc.mask)
+            peak = max(peak, rss_mb() or 0.0)
+            worker_peak = max(worker_peak, enc.rss_mb or 0.0)
+            if held >= budget:
+                chunks.append(_save_chunk(out))
+                out = fitz.open()
+                held = 0
+        if len(out) or not chunks:
+            chunks.append(_save_chunk(out))
+        else:
+            out.close()
+        n_chunks = len(chunks)
+        if n_chunks > 1:
+            _concat_chunks(chunks, out_pdf, strip_metadata)
+        elif strip_metadata:
+            with pikepdf.open(chunks[0]) as pdf:
+                _safe_strip_metadata(pdf, also_names=True)
+                pdf.save(str(out_pdf), compress_streams=True, object_stream_mode=pikepdf.ObjectStreamMode.generate)
+        else:
+            if Path(out_pdf).exists():
+                Path(out_pdf).unlink()
+            os.replace(chunks.pop(), out_pdf)
+        peak = max(peak, rss_mb() or 0.0)
+    finally:
+        if not out.is_closed:
+            out.close()
+        for c in chunks:
+            Path(c).unlink(missing_ok=True)
+    if report is not None:
+        report["pages"] = page_count
+        report["chunks"] = n_chunks
+        report["gray_pages"] = gray_pages
+        report["peak_rss_mb"] = round(peak, 1) if peak else None
+        report["peak_worker_rss_mb"] = round(worker_peak, 1) if worker_peak else None
+
+
+def _maybe_index(out_p: Path, text_source: Path | None, index: bool, report: dict | None) -> None:
+    if not index:
+        return
+    indexed = index_pdf(out_p, text_source=text_source)
+    if report is not None:
+        report["pages_indexed"] = indexed
+
+
+def _finish_output(
+    candidate: Path | None,
+    src_p: Path,
+    out_p: Path,
+    *,
+    linearize: bool,
+    ensure_not_larger: bool,
+    min_shrink_ratio: float,
+    report: dict | None,
+) -> None:
+    # linearizing rewrites the file, so the "never larger" check runs on exactly what gets written
+    temps: list[Path] = []
+    try:
+        if candidate is not None and linearize:
+            temps.append(tmp_path(".pdf"))
+            candidate = Path(linearize_pdf(candidate, temps[-1]))
+        if candidate is None or (ensure_not_larger and candidate.stat().st_size >= int(src_p.stat().st_size * min_shrink_ratio)):
+            candidate = src_p
+            if linearize:
+                temps.append(tmp_path(".pdf"))
+                lin = Path(linearize_pdf(src_p, temps[-1]))
+                # the untouched original only gets the linearized layout when that costs no bytes
+                if lin.stat().st_size <= src_p.stat().st_size:
+                    candidate = lin
+        if candidate == src_p:
+            shutil.copyfile(src_p, out_p)
+        elif candidate != out_p:
+            if out_p.exists():
+                out_p.unlink()
+            os.replace(candidate, out_p)
+    finally:
+        for t in temps:
+            t.unlink(missing_ok=True)
+    if report is not None and linearize:
+        report["linearized"] = verify_linearized(out_p)
+        report.update(first_page_ready(out_p))
 
 
 def compress_pdf(
@@ -91,63 +439,136 @@ def compress_pdf(
     target_dpi: int = 144,
     jpeg_quality: int = 75,
     grayscale: bool = False,
+    auto_grayscale: bool = True,
     strip_metadata: bool = True,
+    subset_fonts: bool = True,
+    linearize: bool = False,
+    index: bool = False,
     ensure_not_larger: bool = True,
     min_shrink_ratio: float = 0.98,
     target_percent: int | None = None,
+    bitonal: bool = False,
+    bitonal_dpi: int = 300,
+    workers: int | None = None,
+    memory_budget_mb: int = 256,
+    report: dict | None = None,
+    progress: Callable[[int, int], None] | None = None,
+    cancel: threading.Event | None = None,
 ) -> str:
     src_p = Path(src)
     out_p = Path(out_pdf)
     out_p.parent.mkdir(parents=True, exist_ok=True)
+    if report is not None and linearize:
+        report["first_page_before"] = first_page_ready(src_p)
 
     if mode == "lossless":
-        with pikepdf.open(src_p) as pdf:
-            if strip_metadata:
-                _safe_strip_metadata(pdf, also_names=True)
-            pdf.save(str(out_p), compress_streams=True, object_stream_mode=pikepdf.ObjectStreamMode.generate)
-        if ensure_not_larger and out_p.stat().st_size >= int(src_p.stat().st_size * min_shrink_ratio):
-            shutil.copyfile(src_p, out_p)
+        optimize_pdf_lossless(src_p, out_p, strip_metadata=strip_metadata, fonts=subset_fonts, report=report)
+        _finish_output(out_p, src_p, out_p, linearize=linearize, ensure_not_larger=ensure_not_larger, min_shrink_ratio=min_shrink_ratio, report=report)
+        _maybe_index(out_p, None, index, report)
+        if report is not None:
+            report["size_after"] = out_p.stat().st_size
         return str(out_p)
 
-    if mode != "images":
+    if mode not in ("images", "mrc"):
         raise ValueError("Unknown mode: " + mode)
+    opts = RasterOptions(dpi=int(target_dpi), quality=int(jpeg_quality), grayscale=grayscale, auto_gray=auto_grayscale, bitonal=bitonal, bitonal_dpi=int(bitonal_dpi), mrc=mode == "mrc")
+    raster_kw = dict(strip_metadata=strip_metadata, workers=workers, memory_budget_mb=memory_budget_mb, report=report, progress=progress, cancel=cancel)
 
-    if target_percent and 1 <= target_percent < 100:
-        src_size = src_p.stat().st_size
-        target_max = int(src_size * (target_percent / 100.0))
-        best = None
-        best_sz = None
-        dpi = int(target_dpi)
-        q = int(jpeg_quality)
-        for _ in range(8):
-            trial = tmp_path(".pdf")
-            _rasterize_pdf(src_p, trial, dpi=dpi, quality=q, grayscale=grayscale, strip_metadata=strip_metadata)
-            sz = trial.stat().st_size
-            if best is None or sz < best_sz:
-                best, best_sz = trial, sz
-            if sz <= target_max:
-                break
-            dpi = max(72, int(dpi * 0.85))
-            q = max(40, q - 7)
-        if best is None:
-            shutil.copyfile(src_p, out_p)
-            return str(out_p)
-        if ensure_not_larger and best_sz >= int(src_p.stat().st_size * min_shrink_ratio):
-            shutil.copyfile(src_p, out_p)
-            Path(best).unlink(missing_ok=True)
-            return str(out_p)
-        if out_p.exists():
-            out_p.unlink()
-        os.replace(best, out_p)
+    trials: list[Path] = []
+    pool: ProcessPoolExecutor | None = None
+    try:
+        if target_percent and 1 <= target_percent < 100:
+            with fitz.open(str(src_p)) as d:
+                n = _raster_workers(workers, len(d))
+            if n > 1:
+                # one pool for all trials: workers start and open the source only once
+                pool = _raster_pool(src_p, n)
+                raster_kw["executor"] = pool
+            src_size = src_p.stat().st_size
+            target_max = int(src_size * (target_percent / 100.0))
+            best = None
+            best_sz = None
+            dpi = int(target_dpi)
+            q = int(jpeg_quality)
+            for _ in range(8):
+                trial = tmp_path(".pdf")
+                trials.append(trial)
+                _rasterize_pdf(src_p, trial, replace(opts, dpi=dpi, quality=q), **raster_kw)
+                sz = trial.stat().st_size
+                if best is None or sz < best_sz:
+                    best, best_sz = trial, sz
+                if sz <= target_max:
+                    break
+                dpi = max(72, int(dpi * 0.85))
+                q = max(40, q - 7)
+        else:
+            best = tmp_path(".pdf")
+            trials.append(best)
+            _rasterize_pdf(src_p, best, opts, **raster_kw)
+        _finish_output(best, src_p, out_p, linearize=linearize, ensure_not_larger=ensure_not_larger, min_shrink_ratio=min_shrink_ratio, report=report)
+        # rasterized pages carry no text, so the output is indexed with the text of the original
+        _maybe_index(out_p, src_p, index, report)
+        if report is not None:
+            report["size_before"] = src_p.stat().st_size
+            report["size_after"] = out_p.stat().st_size
         return str(out_p)
+    finally:
+        if pool is not None:
+            # leaving with an exception (cancel included) must not wait for pages still in flight
+            stop_pool(pool, abandon=sys.exc_info()[0] is not None)
+        for t in trials:
+            Path(t).unlink(missing_ok=True)
 
-    tmp = tmp_path(".pdf")
-    _rasterize_pdf(src_p, tmp, dpi=int(target_dpi), quality=int(jpeg_quality), grayscale=grayscale, strip_metadata=strip_metadata)
-    if ensure_not_larger and tmp.stat().st_size >= int(src_p.stat().st_size * min_shrink_ratio):
-        shutil.copyfile(src_p, out_p)
-        Path(tmp).unlink(missing_ok=True)
-    else:
-        if out_p.exists():
-            out_p.unlink()
-        os.replace(tmp, out_p)
-    return str(out_p)
+
+def compress_pdf_batch(
+    jobs: Iterable[tuple[str | Path, str | Path]],
+    *,
+    max_parallel: int = 2,
+    progress: Callable[[int, int], None] | None = None,
+    cancel: threading.Event | None = None,
+    **options,
+) -> Iterator[tuple[str, str | None, str | None, dict]]:
+    jobs = [(str(a), str(b)) for a, b in jobs]
+    # state is kept per job index: the same source may be listed twice (e.g. with different outputs)
+    totals: list[int] = []
+    for src, _ in jobs:
+        try:
+            with fitz.open(src) as d:
+                totals.append(len(d))
+        except Exception:
+            totals.append(1)
+    grand_total = max(1, sum(totals))
+    done_pages = [0] * len(jobs)
+    lock = threading.Lock()
+    n_docs = max(1, min(int(max_parallel), len(jobs) or 1))
+    options.setdefault("workers", max(1, default_workers() // n_docs))
+
+    def on_pages(i: int, done: int, total: int) -> None:
+        with lock:
+            done_pages[i] = done * totals[i] // max(1, total)
+            current = sum(done_pages)
+        if progress is not None:
+            progress(current, grand_total)
+
+    def run(i: int, src: str, dst: str, report: dict) -> str:
+        check_cancel(cancel)
+        res = compress_pdf(src, dst, progress=lambda d, t: on_pages(i, d, t), cancel=cancel, report=report, **options)
+        on_pages(i, 1, 1)
+        return res
+
+    with ThreadPoolExecutor(max_workers=n_docs) as ex:
+        reports: list[dict] = [{} for _ in jobs]
+        futures = {ex.submit(run, i, src, dst, reports[i]): i for i, (src, dst) in enumerate(jobs)}
+        try:
+            for fut in as_completed(futures):
+                i = futures[fut]
+                src = jobs[i][0]
+                try:
+                    yield src, fut.result(), None, reports[i]
+                except OperationCancelled:
+                    continue
+                except Exception as e:
+                    yield src, None, str(e), reports[i]
+        finally:
+            for fut in futures:
+                fut.cancel()
@@ -1,8 +1,21 @@
 from __future__ import annotations
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait
+from contextlib import nullcontext
+from itertools import islice
 from pathlib import Path
-from typing import Optional, Literal
+from typing import Callable, Iterator, Optional, Literal
+import io
+import struct
+import threading
+import zlib
 import fitz
+import numpy as np
+from PIL import Image
 from pptx import Presentation
+from .pdf_utils import check_cancel, default_workers, stop_pool, worker_init, worker_source
+from .text_index import index_pdf, page_sink
+from .page_render import render_page
 
 
 def _resolve_pages(doc, rng: Optional[str]) -> list[int]:
@@ -24,50 +37,348 @@ def _resolve_pages(doc, rng: Optional[str]) -> list[int]:
     return [p for p in out if 0 <= p < total]
 
 
-def pdf_to_images(src_pdf: str | Path, out_dir: str | Path, *, fmt: Literal["jpg","png"]="jpg", dpi: int = 144, rgb: bool = True, page_range: Optional[str] = None) -> list[str]:
+def _worker_call(task: Callable, pno: int, args: tuple):
+    return task(worker_source(), pno, *args)
+
+
+def _map_pages(
+    src_pdf: str | Path,
+    pages: list[int],
+    task: Callable,
+    args: tuple = (),
+    *,
+    workers: Optional[int] = None,
+    progress: Optional[Callable[[int, int], None]] = None,
+    cancel: Optional[threading.Event] = None,
+    min_pages_per_worker: int = 4,
+) -> Iterator:
+    # task(doc, pno, *args) runs in worker processes that each open their own document; results come back in page order
+    total = len(pages)
+    n = default_workers() if workers is None else max(1, int(workers))
+    n = min(n, max(1, total // max(1, min_pages_per_worker)))
+    if n <= 1:
+        doc = fitz.open(str(src_pdf))
+        try:
+            for done, pno in enumerate(pages, start=1):
+                check_cancel(cancel)
+                res = task(doc, pno, *args)
+                if progress is not None:
+                    progress(done, total)
+                yield res
+        finally:
+            doc.close()
+        return
+    it = iter(pages)
+    ex = ProcessPoolExecutor(max_workers=n, initializer=worker_init, initargs=(fitz.open, str(src_pdf)))
+    pending: deque = deque()
+    done = 0
+    try:
+        pending.extend(ex.submit(_worker_call, task, pno, args) for pno in islice(it, n * 2))
+        while pending:
+            while not wait([pending[0]], timeout=0.2).done:
+                check_cancel(cancel)
+            res = pending.popleft().result()
+            nxt = next(it, None)
+            if nxt is not None:
+                pending.append(ex.submit(_worker_call, task, nxt, args))
+            done += 1
+            if progress is not None:
+                progress(done, total)
+            yield res
+    finally:
+        stop_pool(ex, pending)
+
+
+def _page_file(out_dir: Path, stem: str, pno: int, ext: str) -> Path:
+    return out_dir / f"{stem}_{pno+1:04d}.{ext}"
+
+
+# pages whose raw raster exceeds this are rendered in horizontal bands, each at most BAND_BYTES
+BAND_THRESHOLD_BYTES = 256 * 1024 * 1024
+BAND_BYTES = 16 * 1024 * 1024
+
+
+def _iter_bands(page: fitz.Page, scale: float, cs: fitz.Colorspace, band_bytes: int = BAND_BYTES) -> Iterator[np.ndarray]:
+    mat = fitz.Matrix(scale, scale)
+    full = (page.rect * mat).irect
+    w, h = full.width, full.height
+    rows = max(16, band_bytes // max(1, w * cs.n))
+    r = page.rect
+    # every band replays the same display list instead of re-interpreting the page
+    dl = page.get_displaylist()
+    for r0 in range(0, h, rows):
+        r1 = min(h, r0 + rows)
+        clip = fitz.Rect(r.x0, r.y0 + r0 / scale, r.x1, r.y0 + r1 / scale)
+        pix = dl.get_pixmap(matrix=mat, colorspace=cs, clip=clip, alpha=False)
+        band = np.frombuffer(pix.samples, np.uint8).reshape(pix.height, pix.width, cs.n)[: r1 - r0, :w]
+        if band.shape[0] < r1 - r0 or band.shape[1] < w:
+            # clip rounding can drop an edge row/column; pad with white so the bands tile the page exactly
+            padded = np.full((r1 - r0, w, cs.n), 255, np.uint8)
+            padded[: band.shape[0], : band.shape[1]] = band
+            band = padded
+        yield band
+        del pix
+
+
+def _png_chunk(f, tag: bytes, data: bytes) -> None:
+    f.write(struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF))
+
+
+def _write_png_bands(f, bands: Iterator[np.ndarray], w: int, h: int, n: int, dpi: int) -> None:
+    # rows go through the "Up" filter and a streaming deflate, so only the current band is held in memory
+    f.write(b"\x89PNG\r\n\x1a\n")
+    _png_chunk(f, b"IHDR", struct.pack(">IIBBBBB", w, h, 8, 2 if n == 3 else 0, 0, 0, 0))
+    ppm = round(dpi / 0.0254)
+    _png_chunk(f, b"pHYs", struct.pack(">IIB", ppm, ppm, 1))
+    z = zlib.compressobj(6)
+    prev = np.zeros((1, w * n), np.uint8)
+    for band in bands:
+        rows = band.reshape(band.shape[0], w * n)
+        filtered = np.empty((rows.shape[0], w * n + 1), np.uint8)
+        filtered[:, 0] = 2
+        filtered[:1, 1:] = rows[:1] - prev
+        filtered[1:, 1:] = rows[1:] - rows[:-1]
+        prev = rows[-1:].copy()
+        data = z.compress(filtered.tobytes())
+        if data:
+            _png_chunk(f, b"IDAT", data)
+    _png_chunk(f, b"IDAT", z.flush())
+    _png_chunk(f, b"IEND", b"")
+
+
+def _write_tiff_bands(f, bands: Iterator[np.ndarray], w: int, h: int, n: int, dpi: int) -> None:
+    # one deflate strip per band; the IFD goes after the strips, so f must be seekable
+    f.write(b"II*\x00\x00\x00\x00\x00")
+    offsets: list[int] = []
+    counts: list[int] = []
+    rows_per_strip = 0
+    for band in bands:
+        rows_per_strip = rows_per_strip or band.shape[0]
+        data = zlib.compress(band.tobytes(), 6)
+        offsets.append(f.tell())
+        counts.append(len(data))
+        f.write(data)
+        if f.tell() % 2:
+            f.write(b"\x00")
+    pos = f.tell()
+    extra = bytearray()
+
+    def out_of_line(data: bytes) -> int:
+        off = pos + 2 + 12 * 14 + 4 + len(extra)
+        extra.extend(data)
+        if len(extra) % 2:
+            extra.append(0)
+        return off
+
+    def longs(vals: list[int]) -> tuple[int, int]:
+        return (4, len(vals), vals[0]) if len(vals) == 1 else (4, len(vals), out_of_line(struct.pack(f"<{len(vals)}I", *vals)))
+
+    bits = (3, n, 8) if n == 1 else (3, n, out_of_line(struct.pack(f"<{n}H", *([8] * n))))
+    res = (5, 1, out_of_line(struct.pack("<II", int(dpi), 1)))
+    tags = [
+        (256, 4, 1, w),
+        (257, 4, 1, h),
+        (258, *bits),
+        (259, 3, 1, 8),
+        (262, 3, 1, 2 if n == 3 else 1),
+        (273, *longs(offsets)),
+        (277, 3, 1, n),
+        (278, 4, 1, rows_per_strip or h),
+        (279, *longs(counts)),
+        (282, *res),
+        (283, *res),
+        (284, 3, 1, 1),
+        (296, 3, 1, 2),
+        (317, 3, 1, 1),
+    ]
+    ifd = bytearray(struct.pack("<H", len(tags)))
+    for tag, typ, count, value in tags:
+        packed = struct.pack("<H", value) + b"\x00\x00" if typ == 3 and count == 1 else struct.pack("<I", value)
+        ifd += struct.pack("<HHI", tag, typ, count) + packed
+    ifd += struct.pack("<I", 0)
+    f.write(bytes(ifd) + bytes(extra))
+    f.seek(4)
+    f.write(struct.pack("<I", pos))
+
+
+def _save_page_image(page: fitz.Page, out, fmt: str, dpi: int, rgb: bool, *, jpg_quality: int = 95) -> None:
+    # out is a path or a binary stream
+    scale = dpi / 72.0
+    cs = fitz.csRGB if rgb else fitz.csGRAY
+    full = (page.rect * fitz.Matrix(scale, scale)).irect
+    w, h = full.width, full.height
+    if fmt not in ("tif", "tiff") and w * h * cs.n <= BAND_THRESHOLD_BYTES:
+        pix = render_page(page, dpi=dpi, colorspace=cs)
+        if fmt in ("jpg", "jpeg"):
+            # Pillow's encoder is several times faster than MuPDF's and reads the samples without a copy
+            mode = "RGB" if cs.n == 3 else "L"
+            Image.frombuffer(mode, (pix.width, pix.height), pix.samples_mv, "raw", mode, 0, 1).save(out, "JPEG", quality=jpg_quality, dpi=(dpi, dpi))
+        elif isinstance(out, (str, Path)):
+            pix.set_dpi(int(dpi), int(dpi))
+            pix.save(str(out))
+        else:
+            pix.set_dpi(int(dpi), int(dpi))
+            out.write(pix.tobytes("png"))
+        return
+    bands = _iter_bands(page, scale, cs)
+    if fmt in ("jpg", "jpeg"):
+        # Pillow has no streaming JPEG encoder: the bands are assembled into one buffer, still without the extra full-page pixmap
+        im = Image.new("RGB" if cs.n == 3 else "L", (w, h))
+        y = 0
+        for band in bands:
+            im.paste(Image.fromarray(band if cs.n == 3 else band[:, :, 0]), (0, y))
+            y += band.shape[0]
+        im.save(out, "JPEG", quality=jpg_quality, dpi=(dpi, dpi))
+        return
+    writer = _write_png_bands if fmt == "png" else _write_tiff_bands
+    if isinstance(out, (str, Path)):
+        with open(out, "wb") as f:
+            writer(f, bands, w, h, cs.n, dpi)
+    else:
+        writer(out, bands, w, h, cs.n, dpi)
+
+
+def _render_to_file(doc: fitz.Document, pno: int, out_dir: str, stem: str, fmt: str, dpi: int, rgb: bool) -> str:
+    out = _page_file(Path(out_dir), stem, pno, fmt)
+    _save_page_image(doc.load_page(pno), out, fmt, dpi, rgb)
+    return str(out)
+
+
+def pdf_to_images(
+    src_pdf: str | Path,
+    out_dir: str | Path,
+    *,
+    fmt: Literal["jpg","png","tif"]="jpg",
+    dpi: int = 144,
+    rgb: bool = True,
+    page_range: Optional[str] = None,
+    workers: Optional[int] = None,
+    progress: Optional[Callable[[int, int], None]] = None,
+    cancel: Optional[threading.Event] = None,
+) -> list[str]:
     out_dir = Path(out_dir)
     out_dir.mkdir(parents=True, exist_ok=True)
-    doc = fitz.open(str(src_pdf))
-    pages = _resolve_pages(doc, page_range)
-    paths: list[str] = []
-    scale = dpi / 72.0
-    mat = fitz.Matrix(scale, scale)
-    stem = Path(src_pdf).stem
-    for pno in pages:
-        pix = doc.load_page(pno).get_pixmap(matrix=mat, colorspace=fitz.csRGB if rgb else fitz.csGRAY)
-        out = out_dir / f"{stem}_{pno+1:04d}.{fmt}"
-        pix.save(str(out))
-        paths.append(str(out))
-    return paths
+    with fitz.open(str(src_pdf)) as doc:
+        pages = _resolve_pages(doc, page_range)
+    args = (str(out_dir), Path(src_pdf).stem, fmt, int(dpi), rgb)
+    return list(_map_pages(src_pdf, pages, _render_to_file, args, workers=workers, progress=progress, cancel=cancel))
+
+
+# PowerPoint accepts slide sides between 1 and 56 inches
+_SLIDE_MIN_EMU = 914400
+_SLIDE_MAX_EMU = 51206400
+_EMU_PER_PT = 12700
+
 
+def _render_to_bytes(doc: fitz.Document, pno: int, fmt: str, dpi: int, rgb: bool, jpg_quality: int) -> tuple[bytes, float, float]:
+    page = doc.load_page(pno)
+    buf = io.BytesIO()
+    _save_page_image(page, buf, fmt, dpi, rgb, jpg_quality=jpg_quality)
+    return buf.getvalue(), page.rect.width, page.rect.height
 
-def pdf_to_pptx_snapshots(src_pdf: str | Path, out_pptx: str | Path, *, dpi: int = 144, rgb: bool = True) -> str:
-    doc = fitz.open(str(src_pdf))
+
+def _slide_size(w_pt: float, h_pt: float) -> tuple[int, int]:
+    w, h = w_pt * _EMU_PER_PT, h_pt * _EMU_PER_PT
+    k = min(1.0, _SLIDE_MAX_EMU / max(w, h))
+    k = max(k, _SLIDE_MIN_EMU / min(w * k, h * k))
+    return min(_SLIDE_MAX_EMU, int(w * k)), min(_SLIDE_MAX_EMU, int(h * k))
+
+
+def pdf_to_pptx_snapshots(
+    src_pdf: str | Path,
+    out_pptx: str | Path,
+    *,
+    dpi: int = 144,
+    rgb: bool = True,
+    fmt: Literal["jpg","png"] = "jpg",
+    jpg_quality: int = 85,
+    page_range: Optional[str] = None,
+    workers: Optional[int] = None,
+    progress: Optional[Callable[[int, int], None]] = None,
+    cancel: Optional[threading.Event] = None,
+) -> str:
+    out_pptx = Path(out_pptx)
+    out_pptx.parent.mkdir(parents=True, exist_ok=True)
+    with fitz.open(str(src_pdf)) as doc:
+        pages = _resolve_pages(doc, page_range)
+        if not pages:
+            raise ValueError("Нет страниц для конвертации")
+        first = doc.load_page(pages[0]).rect
     prs = Presentation()
     blank = prs.slide_layouts[6]
+    prs.slide_width, prs.slide_height = _slide_size(first.width, first.height)
     slide_w, slide_h = prs.slide_width, prs.slide_height
-    scale = dpi / 72.0
-    mat = fitz.Matrix(scale, scale)
-    tmp_dir = Path(out_pptx).with_suffix("").parent
-    tmp_dir.mkdir(parents=True, exist_ok=True)
-    for pno in range(len(doc)):
-        page = doc.load_page(pno)
-        pix = page.get_pixmap(matrix=mat, colorspace=fitz.csRGB if rgb else fitz.csGRAY)
-        tmp_img = tmp_dir / f"__tmp_slide_{pno:04d}.png"
-        pix.save(str(tmp_img))
+    args = (fmt, int(dpi), rgb, int(jpg_quality))
+    for data, w_pt, h_pt in _map_pages(src_pdf, pages, _render_to_bytes, args, workers=workers, progress=progress, cancel=cancel):
+        # pages with a different aspect are letterboxed on the first page's slide size
+        k = min(slide_w / w_pt, slide_h / h_pt)
+        w, h = int(w_pt * k), int(h_pt * k)
         slide = prs.slides.add_slide(blank)
-        slide.shapes.add_picture(str(tmp_img), left=0, top=0, width=slide_w, height=slide_h)
-        tmp_img.unlink(missing_ok=True)
+        slide.shapes.add_picture(io.BytesIO(data), left=(slide_w - w) // 2, top=(slide_h - h) // 2, width=w, height=h)
     prs.save(str(out_pptx))
     return str(out_pptx)
 
 
-def pdf_to_text(src_pdf: str | Path, out_txt: str | Path) -> str:
+TextMode = Literal["plain","blocks","words"]
+
+
+def _page_text(doc: fitz.Document, pno: int, mode: str) -> str:
+    page = doc.load_page(pno)
+    if mode == "blocks":
+        # reading order, one paragraph per text block; image blocks are skipped
+        return "\n\n".join(b[4].strip() for b in page.get_text("blocks", sort=True) if b[6] == 0)
+    if mode == "words":
+        lines: dict[tuple[int, int], list[str]] = {}
+        for w in page.get_text("words", sort=True):
+            lines.setdefault((w[5], w[6]), []).append(w[4])
+        return "\n".join(" ".join(ws) for ws in lines.values())
+    return page.get_text("text")
+
+
+def pdf_to_text(
+    src_pdf: str | Path,
+    out_txt: str | Path,
+    *,
+    mode: TextMode = "plain",
+    page_range: Optional[str] = None,
+    per_page: bool = False,
+    index: bool = False,
+    workers: Optional[int] = None,
+    progress: Optional[Callable[[int, int], None]] = None,
+    cancel: Optional[threading.Event] = None,
+) -> str:
+    # pages are written as soon as they arrive; with per_page, out_txt is a folder with one file per page
     out_txt = Path(out_txt)
-    out_txt.parent.mkdir(parents=True, exist_ok=True)
-    doc = fitz.open(str(src_pdf))
-    text = []
-    for p in doc:
-        text.append(p.get_text("text"))
-    out_txt.write_text("\n".join(text), encoding="utf-8")
+    if mode not in ("plain", "blocks", "words"):
+        raise ValueError(f"Неизвестный режим текста: {mode}")
+    with fitz.open(str(src_pdf)) as doc:
+        pages = _resolve_pages(doc, page_range)
+        whole = pages == list(range(len(doc)))
+    # the extracted text feeds the search index directly unless only part of the document is exported
+    sink = page_sink(src_pdf) if index and whole else None
+    try:
+        texts = _map_pages(src_pdf, pages, _page_text, (mode,), workers=workers, progress=progress, cancel=cancel, min_pages_per_worker=50)
+        stem = Path(src_pdf).stem
+        if per_page:
+            out_txt.mkdir(parents=True, exist_ok=True)
+        else:
+            out_txt.parent.mkdir(parents=True, exist_ok=True)
+        with nullcontext() if per_page else open(out_txt, "w", encoding="utf-8") as f:
+            for i, (pno, text) in enumerate(zip(pages, texts)):
+                if f is None:
+                    _page_file(out_txt, stem, pno, "txt").write_text(text, encoding="utf-8")
+                else:
+                    if i:
+                        f.write("\n")
+                    f.write(text)
+                if sink is not None:
+                    sink.add(pno, text)
+        if sink is not None:
+            sink.commit(len(pages))
+    finally:
+        # a cancelled export leaves nothing half-indexed
+        if sink is not None:
+            sink.close()
+    if index and not whole:
+        index_pdf(src_pdf)
     return str(out_txt)
@@ -1,32 +1,139 @@
 from __future__ import annotations
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from itertools import islice
 from pathlib import Path
-from typing import Iterable, Optional
+from typing import Callable, Iterable, Optional
+import hashlib
+import io
+import json
 import os
+import shutil
+import threading
 import fitz
+import pikepdf
 from PIL import Image
-from .pdf_utils import tmp_path
-from .office_convert import docx_to_pdf_basic, xlsx_to_pdf_basic, pptx_to_pdf_basic
+from .pdf_utils import tmp_path, check_cancel, default_workers, rss_mb, stop_pool
+from .pdf_optimize import linearize_pdf, slim_pdf
+from .text_index import index_pdf
+from .office_convert import docx_to_pdf_basic, xlsx_to_pdf_basic, pptx_to_pdf_basic, converter_fingerprint
+from .convert_cache import cached_convert, file_sha256
 
 OFFICE_EXT = {".doc", ".docx", ".ppt", ".pptx", ".xls", ".xlsx"}
 IMAGE_EXT = {".jpg", ".jpeg", ".png", ".webp", ".tif", ".tiff", ".bmp"}
 
-def _exif_rotate_deg(path: Path) -> int:
+def _exif_rotate_deg(im: Image.Image) -> int:
     try:
-        with Image.open(path) as im:
-            exif = im.getexif()
-            if not exif:
-                return 0
-            val = exif.get(274, 1)
-            if val == 3:
-                return 180
-            if val == 6:
-                return 270
-            if val == 8:
-                return 90
+        exif = im.getexif()
+        if not exif:
             return 0
+        val = exif.get(274, 1)
+        if val == 3:
+            return 180
+        if val == 6:
+            return 270
+        if val == 8:
+            return 90
+        return 0
     except Exception:
         return 0
 
+def _convert_office(src: Path, out_pdf: Path) -> str:
+    # returns the fingerprint of the backend that actually produced out_pdf
+    ext = src.suffix.lower()
+    report: dict = {}
+    if ext in {".doc", ".docx"}:
+        docx_to_pdf_basic(src, out_pdf, report=report)
+    elif ext in {".xls", ".xlsx"}:
+        xlsx_to_pdf_basic(src, out_pdf, report=report)
+    else:
+        pptx_to_pdf_basic(src, out_pdf, report=report)
+    return converter_fingerprint(src, report["backend"])
+
+
+def _prepare_office(src: Path, out_pdf: Path, use_cache: bool) -> tuple[Path, bool]:
+    if not use_cache:
+        _convert_office(src, out_pdf)
+        return out_pdf, False
+    return out_pdf, cached_convert(src, out_pdf, converter_fingerprint(src), _convert_office)
+
+
+def _placed_size(iw: int, ih: int, inner: Optional[fitz.Rect]) -> tuple[float, float]:
+    if inner is None:
+        return float(iw), float(ih)
+    s = min(inner.width / iw, inner.height / ih)
+    return iw * s, ih * s
+
+
+def _prepare_image(path: Path, inner: Optional[fitz.Rect], max_dpi: Optional[int]) -> tuple[int, int, int, Optional[bytes], str]:
+    digest = file_sha256(path)
+    # Image.open only parses the header; pixels are decoded below only when the image has to be downsampled
+    with Image.open(path) as im:
+        rot = _exif_rotate_deg(im)
+        iw, ih = im.size
+        if rot in (90, 270):
+            iw, ih = ih, iw
+        if not max_dpi:
+            return iw, ih, rot, None, digest
+        w_pt, _ = _placed_size(iw, ih, inner)
+        scale = (w_pt / 72.0 * max_dpi) / iw
+        if scale >= 0.9:
+            return iw, ih, rot, None, digest
+        size = (max(1, round(im.width * scale)), max(1, round(im.height * scale)))
+        is_jpeg = im.format == "JPEG"
+        if is_jpeg:
+            im.draft(im.mode, size)
+        if im.mode not in ("RGB", "L", "RGBA", "LA", "CMYK"):
+            im = im.convert("RGBA" if "transparency" in im.info or im.mode in ("P", "PA") else "RGB")
+        small = im.resize(size, Image.Resampling.LANCZOS)
+    bio = io.BytesIO()
+    if is_jpeg and small.mode in ("RGB", "L", "CMYK"):
+        small.save(bio, format="JPEG", quality=85, optimize=True)
+    else:
+        small.save(bio, format="PNG", optimize=True)
+    data = bio.getvalue()
+    if len(data) >= path.stat().st_size:
+        return iw, ih, rot, None, digest
+    return iw, ih, rot, data, digest
+
+
+def _is_a4(rect: fitz.Rect, a4: fitz.Rect, tol: float = 1.0) -> bool:
+    return abs(rect.width - a4.width) <= tol and abs(rect.height - a4.height) <= tol
+
+
+def _page_runs(pages: list[int], keep: Callable[[int], bool]) -> list[tuple[int, int, bool]]:
+    runs: list[tuple[int, int, bool]] = []
+    for i in pages:
+        k = keep(i)
+        if runs and runs[-1][2] == k and runs[-1][1] == i - 1:
+            runs[-1] = (runs[-1][0], i, k)
+        else:
+            runs.append((i, i, k))
+    return runs
+
+
+def _shift_toc(toc: list, page_map: dict[int, int]) -> list:
+    # entries pointing at pages that were left out are dropped; levels are clamped so the result stays valid for set_toc
+    out = []
+    for lvl, title, pno in toc:
+        target = page_map.get(pno - 1)
+        if target is None:
+            continue
+        prev = out[-1][0] if out else 0
+        out.append([min(lvl, prev + 1), title, target + 1])
+    return out
+
+
+def _write_outline(pdf: pikepdf.Pdf, toc: list) -> None:
+    with pdf.open_outline() as outline:
+        # levels[k] holds the children of the current entry at level k
+        levels = [outline.root]
+        for lvl, title, pno in toc:
+            item = pikepdf.OutlineItem(title, pno - 1)
+            del levels[lvl:]
+            levels[-1].append(item)
+            levels.append(item.children)
+
+
 def merge_any_to_pdf(
     inputs: Iterable[str | Path],
     out_pdf: str | Path,
@@ -35,34 +142,61 @@ def merge_any_to_pdf(
     linearize: bool = True,
     fit_to_a4: bool = True,
     fit_margin_mm: float = 0.0,
+    slim: bool = True,
+    use_cache: bool = True,
+    max_image_dpi: Optional[int] = None,
+    index: bool = False,
+    report: Optional[dict] = None,
+    workers: Optional[int] = None,
+    progress: Optional[Callable[[int, int], None]] = None,
+    cancel: Optional[threading.Event] = None,
 ) -> str:
     out_pdf = Path(out_pdf)
     out_pdf.parent.mkdir(parents=True, exist_ok=True)
     mm_to_pt = 72.0 / 25.4
     margin = float(fit_margin_mm) * mm_to_pt
     a4 = fitz.paper_rect("a4")
+    paths = [Path(it) for it in inputs]
+    for p in paths:
+        if not p.exists():
+            raise FileNotFoundError(p)
+        ext = p.suffix.lower()
+        if ext != ".pdf" and ext not in OFFICE_EXT and ext not in IMAGE_EXT:
+            raise RuntimeError(f"Тип файла не поддерживается: {p.name}")
     dst = fitz.open()
     tmp_created: list[Path] = []
+    inner = fitz.Rect(a4.x0 + margin, a4.y0 + margin, a4.x1 - margin, a4.y1 - margin)
+    copied = wrapped = cache_hits = downsampled = reused = 0
+    image_xrefs: dict[str, int] = {}
+    toc: list = []
+    # stage one: Office and image inputs are prepared concurrently, keyed by input index
+    ex = ThreadPoolExecutor(max_workers=workers or default_workers(4))
+    prepared: dict[int, Future] = {}
+    image_jobs: dict[str, Future] = {}
     try:
-        for it in inputs:
-            p = Path(it)
-            if not p.exists():
-                raise FileNotFoundError(p)
+        for idx, p in enumerate(paths):
             ext = p.suffix.lower()
             if ext in OFFICE_EXT:
                 pdf_tmp = tmp_path(".pdf")
-                if ext in {".doc", ".docx"}:
-                    docx_to_pdf_basic(p, pdf_tmp)
-                elif ext in {".xls", ".xlsx"}:
-                    xlsx_to_pdf_basic(p, pdf_tmp)
-                else:
-                    pptx_to_pdf_basic(p, pdf_tmp)
-                p = pdf_tmp
                 tmp_created.append(pdf_tmp)
+                prepared[idx] = ex.submit(_prepare_office, p, pdf_tmp, use_cache)
+            elif ext in IMAGE_EXT:
+                key = str(p.resolve())
+                if key not in image_jobs:
+                    image_jobs[key] = ex.submit(_prepare_image, p, inner if fit_to_a4 else None, max_image_dpi)
+                prepared[idx] = image_jobs[key]
+        # stage two: pages are assembled in the user's order as soon as each input is ready
+        for idx, orig in enumerate(paths):
+            check_cancel(cancel)
+            p = orig
+            ext = p.suffix.lower()
+            if ext in OFFICE_EXT:
+                p, hit = prepared[idx].result()
+                cache_hits += hit
                 ext = ".pdf"
             if ext == ".pdf":
                 src = fitz.open(str(p))
-                rng = (page_ranges or {}).get(str(p)) or (page_ranges or {}).get(p.name)
+                rng = (page_ranges or {}).get(str(orig)) or (page_ranges or {}).get(orig.name)
                 pages = list(range(len(src)))
                 if rng:
                     idxs = []
@@ -79,12 +213,25 @@ def merge_any_to_pdf(
                         else:
                             idxs.append(max(1, int(part)) - 1)
                     pages = [i for i in idxs if 0 <= i < total]
+                if keep_outlines:
+                    # every selected page becomes exactly one output page, in order; a repeated page keeps its first position
+                    base = len(dst)
+                    page_map = {i: base + k for k, i in reversed(list(enumerate(pages)))}
+                    toc.extend(_shift_toc(src.get_toc(), page_map))
                 if fit_to_a4:
-                    for i in pages:
+                    # pages that are already A4 (and need no margin) are copied as is
+                    keep = (lambda i: _is_a4(src[i].rect, a4)) if margin <= 0 else (lambda i: False)
+                else:
+                    keep = lambda i: True
+                for a, b, as_is in _page_runs(pages, keep):
+                    if as_is:
+                        dst.insert_pdf(src, from_page=a, to_page=b)
+                        copied += b - a + 1
+                        continue
+                    for i in range(a, b + 1):
                         page = src[i]
                         new = dst.new_page(width=a4.width, height=a4.height)
                         new.draw_rect(a4, color=(1, 1, 1), fill=(1, 1, 1))
-                        inner = fitz.Rect(a4.x0 + margin, a4.y0 + margin, a4.x1 - margin, a4.y1 - margin)
                         r = page.rect
                         s = min(inner.width / r.width, inner.height / r.height)
                         w = r.width * s
@@ -93,42 +240,213 @@ def merge_any_to_pdf(
                         top = inner.y0 + (inner.height - h) / 2.0
                         target = fitz.Rect(left, top, left + w, top + h)
                         new.show_pdf_page(target, src, i)
-                else:
-                    dst.insert_pdf(src)
+                        wrapped += 1
                 src.close()
-            elif ext in IMAGE_EXT:
-                rot = _exif_rotate_deg(p)
-                pix = fitz.Pixmap(str(p))
-                iw, ih = pix.width, pix.height
-                if rot in (90, 270):
-                    iw, ih = ih, iw
+            else:
+                iw, ih, rot, data, digest = prepared[idx].result()
+                # identical image content is embedded once and referenced by xref afterwards
+                if digest in image_xrefs:
+                    img = {"xref": image_xrefs[digest]}
+                    reused += 1
+                elif data is not None:
+                    img = {"stream": data}
+                    downsampled += 1
+                else:
+                    img = {"filename": str(p)}
                 if fit_to_a4:
                     new = dst.new_page(width=a4.width, height=a4.height)
                     new.draw_rect(a4, color=(1, 1, 1), fill=(1, 1, 1))
-                    inner = fitz.Rect(a4.x0 + margin, a4.y0 + margin, a4.x1 - margin, a4.y1 - margin)
-                    s = min(inner.width / iw, inner.height / ih)
-                    w = iw * s
-                    h = ih * s
+                    w, h = _placed_size(iw, ih, inner)
                     left = inner.x0 + (inner.width - w) / 2.0
                     top = inner.y0 + (inner.height - h) / 2.0
                     rect = fitz.Rect(left, top, left + w, top + h)
-                    new.insert_image(rect, filename=str(p), rotate=rot)
                 else:
                     new = dst.new_page(width=iw, height=ih)
                     rect = fitz.Rect(0, 0, iw, ih)
-                    new.insert_image(rect, filename=str(p), rotate=rot)
-            else:
-                raise RuntimeError(f"Тип файла не поддерживается: {p.name}")
+                image_xrefs[digest] = new.insert_image(rect, rotate=rot, **img)
+            if progress is not None:
+                progress(idx + 1, len(paths))
+        ex.shutdown()
+        if toc:
+            dst.set_toc(toc)
         tmp = tmp_path(".pdf")
-        dst.save(str(tmp))
+        tmp_created.append(tmp)
+        dst.save(str(tmp), garbage=3, deflate=True)
         dst.close()
-        os.replace(tmp, out_pdf)
+        if report is not None:
+            report["pages_copied"] = copied
+            report["pages_wrapped"] = wrapped
+            report["images_downsampled"] = downsampled
+            report["images_reused"] = reused
+            report["cache_hits"] = cache_hits
+            report["cache_misses"] = sum(1 for p in paths if p.suffix.lower() in OFFICE_EXT) - cache_hits if use_cache else 0
+        if slim:
+            slim_pdf(tmp, out_pdf, linearize=linearize, report=report)
+        elif linearize:
+            linearize_pdf(tmp, out_pdf, report=report)
+        else:
+            os.replace(tmp, out_pdf)
         if not out_pdf.exists() or out_pdf.stat().st_size == 0:
             raise RuntimeError("Итоговый файл не создан")
+        if index:
+            indexed = index_pdf(out_pdf)
+            if report is not None:
+                report["pages_indexed"] = indexed
         return str(out_pdf)
     finally:
+        ex.shutdown(wait=True, cancel_futures=True)
+        if not dst.is_closed:
+            dst.close()
         for t in tmp_created:
             try:
                 Path(t).unlink(missing_ok=True)
             except Exception:
                 pass
+
+
+def _merge_chunk(inputs: list[str], part_pdf: str, options: dict) -> str:
+    part = Path(part_pdf)
+    tmp = part.with_suffix(".tmp")
+    merge_any_to_pdf(inputs, tmp, slim=False, linearize=False, workers=1, **options)
+    # a chunk file only appears once it is complete, so its presence is the checkpoint
+    os.replace(tmp, part)
+    return part_pdf
+
+
+def _concat_pdfs(parts: list[Path], out_pdf: Path, fan_in: int = 16, keep_outlines: bool = True) -> None:
+    level: list[Path] = list(parts)
+    made: list[Path] = []
+    try:
+        while len(level) > fan_in:
+            nxt: list[Path] = []
+            for i in range(0, len(level), fan_in):
+                t = tmp_path(".pdf")
+                made.append(t)
+                _concat_pdfs(level[i:i + fan_in], t, fan_in, keep_outlines)
+                nxt.append(t)
+            level = nxt
+        opened: list[pikepdf.Pdf] = []
+        try:
+            with pikepdf.new() as dst:
+                toc: list = []
+                for p in level:
+                    if keep_outlines:
+                        with fitz.open(str(p)) as d:
+                            base = len(dst.pages)
+                            toc.extend(_shift_toc(d.get_toc(), {i: base + i for i in range(len(d))}))
+                    src = pikepdf.open(p)
+                    opened.append(src)
+                    dst.pages.extend(src.pages)
+                if toc:
+                    _write_outline(dst, toc)
+                dst.save(str(out_pdf), compress_streams=True, object_stream_mode=pikepdf.ObjectStreamMode.generate)
+        finally:
+            for src in opened:
+                src.close()
+    finally:
+        for t in made:
+            t.unlink(missing_ok=True)
+
+
+def _chunk_manifest(paths: list[Path], chunk_size: int, options: dict) -> str:
+    items = []
+    for p in paths:
+        st = p.stat()
+        items.append([str(p.resolve()), st.st_size, int(st.st_mtime)])
+    body = json.dumps({"inputs": items, "chunk_size": chunk_size, "options": options}, sort_keys=True, default=str)
+    return hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+
+def merge_any_to_pdf_chunked(
+    inputs: Iterable[str | Path],
+    out_pdf: str | Path,
+    *,
+    chunk_size: int = 200,
+    workers: Optional[int] = None,
+    checkpoint_dir: Optional[str | Path] = None,
+    resume: bool = True,
+    slim: bool = False,
+    linearize: bool = False,
+    index: bool = False,
+    report: Optional[dict] = None,
+    progress: Optional[Callable[[int, int], None]] = None,
+    cancel: Optional[threading.Event] = None,
+    **options,
+) -> str:
+    out_pdf = Path(out_pdf)
+    out_pdf.parent.mkdir(parents=True, exist_ok=True)
+    paths = [Path(it) for it in inputs]
+    for p in paths:
+        if not p.exists():
+            raise FileNotFoundError(p)
+    chunk_size = max(1, int(chunk_size))
+    groups = [paths[i:i + chunk_size] for i in range(0, len(paths), chunk_size)]
+    if not groups:
+        raise RuntimeError("Нет файлов для объединения")
+    work = Path(checkpoint_dir) if checkpoint_dir else out_pdf.parent / f".{out_pdf.name}.parts"
+    manifest = _chunk_manifest(paths, chunk_size, options)
+    manifest_file = work / "manifest.txt"
+    if not (resume and manifest_file.exists() and manifest_file.read_text(encoding="utf-8").strip() == manifest):
+        shutil.rmtree(work, ignore_errors=True)
+    work.mkdir(parents=True, exist_ok=True)
+    manifest_file.write_text(manifest, encoding="utf-8")
+    parts = [work / f"chunk_{i:05d}.pdf" for i in range(len(groups))]
+    todo = [i for i, part in enumerate(parts) if not part.exists()]
+    resumed = len(parts) - len(todo)
+    total = len(parts) + 1
+    done = resumed
+    peak = rss_mb() or 0.0
+    if progress is not None:
+        progress(done, total)
+
+    n = max(1, min(workers or default_workers(4), len(todo) or 1))
+    ex = ProcessPoolExecutor(max_workers=n)
+    queue = iter(todo)
+    pending: set[Future] = set()
+
+    def submit(i: int) -> None:
+        pending.add(ex.submit(_merge_chunk, [str(p) for p in groups[i]], str(parts[i]), options))
+
+    try:
+        # a bounded window: after a cancel at most n chunks are still being written
+        for i in islice(queue, n):
+            submit(i)
+        while pending:
+            finished, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+            check_cancel(cancel)
+            for f in finished:
+                f.result()
+                done += 1
+                peak = max(peak, rss_mb() or 0.0)
+                if progress is not None:
+                    progress(done, total)
+                nxt = next(queue, None)
+                if nxt is not None:
+                    submit(nxt)
+    finally:
+        stop_pool(ex, pending)
+
+    check_cancel(cancel)
+    tmp = tmp_path(".pdf")
+    try:
+        _concat_pdfs(parts, tmp, keep_outlines=options.get("keep_outlines", True))
+        peak = max(peak, rss_mb() or 0.0)
+        if slim:
+            slim_pdf(tmp, out_pdf, linearize=linearize, report=report)
+        elif linearize:
+            linearize_pdf(tmp, out_pdf, report=report)
+        else:
+            os.replace(tmp, out_pdf)
+    finally:
+        tmp.unlink(missing_ok=True)
+    shutil.rmtree(work, ignore_errors=True)
+    indexed = index_pdf(out_pdf) if index else 0
+    if progress is not None:
+        progress(total, total)
+    if report is not None:
+        if index:
+            report["pages_indexed"] = indexed
+        report["chunks"] = len(parts)
+        report["chunks_resumed"] = resumed
+        report["peak_rss_mb"] = round(peak, 1) if peak else None
+    return str(out_pdf)
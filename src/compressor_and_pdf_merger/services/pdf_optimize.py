@@ -0,0 +1,355 @@
+from __future__ import annotations
+from pathlib import Path
+import hashlib
+import io
+import os
+import re
+import time
+import zlib
+import fitz
+import numpy as np
+import pikepdf
+from pikepdf import Array, Dictionary, Name, Stream
+from .pdf_utils import tmp_path, _safe_strip_metadata
+
+CATEGORIES = ("images", "fonts", "streams")
+FONT_FILE_KEYS = ("/FontFile", "/FontFile2", "/FontFile3")
+_SKIP_TYPES = {Name("/XRef"), Name("/ObjStm")}
+_SHARED_TYPES = {Name("/Font"), Name("/FontDescriptor"), Name("/ExtGState"), Name("/Encoding")}
+_LINEARIZED_RE = re.compile(rb"/Linearized\s.*?/E\s+(\d+)", re.S)
+_RESOURCE_KEYS = ("/Font", "/XObject", "/ExtGState", "/Pattern", "/Shading", "/ColorSpace", "/Properties")
+
+
+def _new_stats() -> dict:
+    return {c: {"dedup": 0, "subset": 0, "recompress": 0} for c in CATEGORIES}
+
+
+def _font_file_ids(pdf: pikepdf.Pdf) -> set[tuple[int, int]]:
+    out: set[tuple[int, int]] = set()
+    for obj in pdf.objects:
+        if isinstance(obj, Dictionary) and obj.get("/Type") == Name.FontDescriptor:
+            for k in FONT_FILE_KEYS:
+                ff = obj.get(k)
+                if ff is not None and ff.is_indirect:
+                    out.add(ff.objgen)
+    return out
+
+
+def _category(obj: pikepdf.Object, font_files: set[tuple[int, int]]) -> str:
+    # shared indirect arrays (/Widths, /DecodeParms, ...) have no /Type to look at
+    if not isinstance(obj, (Dictionary, Stream)):
+        return "streams"
+    if obj.objgen in font_files or obj.get("/Type") in (Name.Font, Name.FontDescriptor):
+        return "fonts"
+    if obj.get("/Subtype") == Name.Image:
+        return "images"
+    return "streams"
+
+
+def _object_key(obj: pikepdf.Object) -> tuple[bytes, int] | None:
+    if isinstance(obj, Stream):
+        if obj.get("/Type") in _SKIP_TYPES:
+            return None
+        raw = obj.read_raw_bytes()
+        head = Dictionary({k: obj[k] for k in obj.keys() if k != "/Length"}).unparse(resolved=True)
+        return hashlib.sha256(head + b"stream" + raw).digest(), len(raw)
+    if isinstance(obj, Array) or (isinstance(obj, Dictionary) and obj.get("/Type") in _SHARED_TYPES):
+        body = obj.unparse(resolved=True)
+        return hashlib.sha256(body).digest(), len(body)
+    return None
+
+
+def _rewrite_refs(pdf: pikepdf.Pdf, remap: dict[tuple[int, int], pikepdf.Object]) -> None:
+    def fix(container) -> None:
+        items = list(enumerate(container)) if isinstance(container, Array) else list(container.items())
+        for k, v in items:
+            if not isinstance(v, pikepdf.Object):
+                continue
+            if v.is_indirect:
+                tgt = remap.get(v.objgen)
+                if tgt is not None:
+                    container[k] = tgt
+            elif isinstance(v, (Dictionary, Array)):
+                fix(v)
+
+    for obj in pdf.objects:
+        if isinstance(obj, (Stream, Dictionary, Array)):
+            fix(obj)
+    fix(pdf.trailer)
+
+
+def dedupe_objects(pdf: pikepdf.Pdf, stats: dict | None = None, max_rounds: int = 4) -> int:
+    stats = stats if stats is not None else _new_stats()
+    font_files = _font_file_ids(pdf)
+    dropped: set[tuple[int, int]] = set()
+    for _ in range(max_rounds):
+        seen: dict[bytes, pikepdf.Object] = {}
+        remap: dict[tuple[int, int], pikepdf.Object] = {}
+        for obj in pdf.objects:
+            if obj.objgen in dropped:
+                continue
+            key = _object_key(obj)
+            if key is None:
+                continue
+            first = seen.get(key[0])
+            if first is None:
+                seen[key[0]] = obj
+                continue
+            remap[obj.objgen] = first
+            stats[_category(obj, font_files)]["dedup"] += key[1]
+        if not remap:
+            break
+        _rewrite_refs(pdf, remap)
+        dropped.update(remap)
+    return len(dropped)
+
+
+def _image_colors(obj: Stream) -> int | None:
+    cs = obj.stream_dict.get("/ColorSpace")
+    if cs is None:
+        return None
+    if isinstance(cs, Array) and len(cs) > 0:
+        family = cs[0]
+        if family == Name.ICCBased:
+            n = cs[1].get("/N") if len(cs) > 1 else None
+            return int(n) if n is not None else None
+        if family == Name.Indexed or family == Name.CalGray:
+            return 1
+        if family == Name.CalRGB or family == Name.Lab:
+            return 3
+        return None
+    return {"/DeviceGray": 1, "/DeviceRGB": 3, "/DeviceCMYK": 4}.get(str(cs))
+
+
+def _png_predict(data: bytes, width: int, height: int, colors: int) -> bytes | None:
+    row = width * colors
+    if width <= 0 or height <= 0 or len(data) != row * height:
+        return None
+    a = np.frombuffer(data, dtype=np.uint8).reshape(height, row)
+    sub = a.copy()
+    sub[:, colors:] = a[:, colors:] - a[:, :-colors]
+    up = a.copy()
+    up[1:] = a[1:] - a[:-1]
+    cand = np.stack([a, sub, up])
+    score = np.abs(cand.view(np.int8).astype(np.int32)).sum(axis=2)
+    best = score.argmin(axis=0)
+    out = np.empty((height, row + 1), dtype=np.uint8)
+    out[:, 0] = best
+    out[:, 1:] = cand[best, np.arange(height)]
+    return out.tobytes()
+
+
+def recompress_flate(pdf: pikepdf.Pdf, stats: dict | None = None, level: int = 9) -> None:
+    stats = stats if stats is not None else _new_stats()
+    font_files = _font_file_ids(pdf)
+    for obj in pdf.objects:
+        if not isinstance(obj, Stream):
+            continue
+        d = obj.stream_dict
+        if d.get("/Type") in _SKIP_TYPES or d.get("/Filter") not in (None, Name.FlateDecode):
+            continue
+        try:
+            raw_len = len(obj.read_raw_bytes())
+            data = obj.read_bytes()
+        except Exception:
+            continue
+        cat = _category(obj, font_files)
+        best = zlib.compress(data, level)
+        parms = None
+        if cat == "images" and d.get("/BitsPerComponent") == 8 and "/ImageMask" not in d:
+            colors = _image_colors(obj)
+            if colors:
+                w, h = int(d.get("/Width", 0)), int(d.get("/Height", 0))
+                predicted = _png_predict(data, w, h, colors)
+                if predicted is not None:
+                    packed = zlib.compress(predicted, level)
+                    if len(packed) < len(best):
+                        best = packed
+                        parms = Dictionary(Predictor=15, Colors=colors, BitsPerComponent=8, Columns=w)
+        if len(best) >= raw_len:
+            continue
+        if parms is None:
+            obj.write(best, filter=Name.FlateDecode)
+            if "/DecodeParms" in obj.stream_dict:
+                del obj.stream_dict["/DecodeParms"]
+        else:
+            obj.write(best, filter=Name.FlateDecode, decode_parms=parms)
+        stats[cat]["recompress"] += raw_len - len(best)
+
+
+def _font_stream_sizes(path: Path) -> int:
+    with pikepdf.open(path) as pdf:
+        total = 0
+        for objgen in _font_file_ids(pdf):
+            try:
+                total += len(pdf.get_object(objgen).read_raw_bytes())
+            except Exception:
+                pass
+        return total
+
+
+def subset_fonts(src_pdf: str | Path, out_pdf: str | Path) -> int:
+    before = _font_stream_sizes(Path(src_pdf))
+    doc = fitz.open(str(src_pdf))
+    try:
+        doc.subset_fonts()
+        doc.save(str(out_pdf), garbage=1)
+    finally:
+        doc.close()
+    return max(0, before - _font_stream_sizes(Path(out_pdf)))
+
+
+def _count_resources(pdf: pikepdf.Pdf) -> int:
+    seen: set[tuple[int, int]] = set()
+    total = 0
+
+    def walk(res) -> None:
+        nonlocal total
+        if not isinstance(res, Dictionary):
+            return
+        if res.is_indirect:
+            if res.objgen in seen:
+                return
+            seen.add(res.objgen)
+        for k in _RESOURCE_KEYS:
+            d = res.get(k)
+            if not isinstance(d, Dictionary):
+                continue
+            total += len(d.keys())
+            if k == "/XObject":
+                for _, xo in d.items():
+                    if isinstance(xo, Stream) and xo.get("/Subtype") == Name.Form and xo.objgen not in seen:
+                        seen.add(xo.objgen)
+                        walk(xo.get("/Resources"))
+
+    for page in pdf.pages:
+        walk(page.obj.get("/Resources"))
+    return total
+
+
+def prune_unused_resources(pdf: pikepdf.Pdf) -> int:
+    before = _count_resources(pdf)
+    pdf.remove_unreferenced_resources()
+    return max(0, before - _count_resources(pdf))
+
+
+def verify_linearized(pdf_path: str | Path) -> bool:
+    try:
+        with pikepdf.open(pdf_path) as pdf:
+            return pdf.is_linearized and pdf.check_linearization(stream=io.StringIO())
+    except Exception:
+        return False
+
+
+def first_page_ready(pdf_path: str | Path) -> dict:
+    size = os.path.getsize(pdf_path)
+    with open(pdf_path, "rb") as f:
+        m = _LINEARIZED_RE.search(f.read(1024))
+    t0 = time.perf_counter()
+    doc = fitz.open(str(pdf_path))
+    try:
+        if len(doc):
+            doc.load_page(0).get_pixmap(alpha=False)
+    finally:
+        doc.close()
+    return {
+        "first_page_ms": round((time.perf_counter() - t0) * 1000.0, 1),
+        # a viewer needs only the first-page section of a linearized file, otherwise the whole file
+        "first_page_bytes": min(size, int(m.group(1))) if m else size,
+    }
+
+
+def linearize_pdf(src_pdf: str | Path, out_pdf: str | Path, *, report: dict | None = None) -> str:
+    tmp = tmp_path(".pdf")
+    try:
+        with pikepdf.open(src_pdf) as pdf:
+            pdf.save(str(tmp), linearize=True, compress_streams=True, object_stream_mode=pikepdf.ObjectStreamMode.generate)
+        os.replace(tmp, out_pdf)
+    finally:
+        Path(tmp).unlink(missing_ok=True)
+    if report is not None:
+        report["linearized"] = verify_linearized(out_pdf)
+        report.update(first_page_ready(out_pdf))
+    return str(out_pdf)
+
+
+def slim_pdf(
+    src_pdf: str | Path,
+    out_pdf: str | Path,
+    *,
+    fonts: bool = True,
+    linearize: bool = False,
+    report: dict | None = None,
+) -> str:
+    stage1 = tmp_path(".pdf")
+    stage2 = tmp_path(".pdf")
+    fonts_saved = 0
+    try:
+        with pikepdf.open(src_pdf) as pdf:
+            removed = prune_unused_resources(pdf)
+            pdf.save(str(stage1))
+        current = stage1
+        if fonts:
+            try:
+                fonts_saved = subset_fonts(stage1, stage2)
+                current = stage2
+            except Exception:
+                pass
+        with pikepdf.open(current) as pdf:
+            pdf.save(str(out_pdf), linearize=linearize, compress_streams=True, object_stream_mode=pikepdf.ObjectStreamMode.generate)
+    finally:
+        for t in (stage1, stage2):
+            Path(t).unlink(missing_ok=True)
+    if report is not None:
+        if linearize:
+            report["linearized"] = verify_linearized(out_pdf)
+            report.update(first_page_ready(out_pdf))
+        report["resources_removed"] = removed
+        report["fonts_subset"] = fonts_saved
+        report["size_before"] = os.path.getsize(src_pdf)
+        report["size_after"] = os.path.getsize(out_pdf)
+    return str(out_pdf)
+
+
+def optimize_pdf_lossless(
+    src_pdf: str | Path,
+    out_pdf: str | Path,
+    *,
+    strip_metadata: bool = True,
+    fonts: bool = True,
+    report: dict | None = None,
+) -> str:
+    stats = _new_stats()
+    stage1 = tmp_path(".pdf")
+    stage2 = tmp_path(".pdf")
+    try:
+        with pikepdf.open(src_pdf) as pdf:
+            objects_before = len(pdf.objects)
+            if strip_metadata:
+                _safe_strip_metadata(pdf, also_names=True)
+            dedupe_objects(pdf, stats)
+            removed = prune_unused_resources(pdf)
+            pdf.save(str(stage1))
+        current = stage1
+        if fonts:
+            try:
+                stats["fonts"]["subset"] = subset_fonts(stage1, stage2)
+                current = stage2
+            except Exception:
+                pass
+        with pikepdf.open(current) as pdf:
+            recompress_flate(pdf, stats)
+            pdf.save(str(out_pdf), compress_streams=True, object_stream_mode=pikepdf.ObjectStreamMode.generate)
+        with pikepdf.open(out_pdf) as pdf:
+            objects_after = len(pdf.objects)
+    finally:
+        for t in (stage1, stage2):
+            Path(t).unlink(missing_ok=True)
+    if report is not None:
+        report["savings"] = stats
+        report["objects_removed"] = max(0, objects_before - objects_after)
+        report["resources_removed"] = removed
+        report["fonts_subset"] = stats["fonts"]["subset"]
+        report["size_before"] = os.path.getsize(src_pdf)
+        report["size_after"] = os.path.getsize(out_pdf)
+    return str(out_pdf)
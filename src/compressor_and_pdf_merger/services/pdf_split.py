@@ -0,0 +1,134 @@
+from __future__ import annotations
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+import os
+import threading
+import pikepdf
+from .pdf_utils import check_cancel, default_workers, stop_pool, worker_init, worker_source
+from .pdf_convert import _resolve_pages
+from .pdf_optimize import prune_unused_resources
+
+
+def split_plan(total: int, *, ranges: Optional[Iterable[str]] = None, every: Optional[int] = None) -> list[list[int]]:
+    # each range spec ("1-3,7", "10-") becomes one part; "every" cuts the whole document into runs of N pages
+    if every:
+        n = max(1, int(every))
+        return [list(range(i, min(total, i + n))) for i in range(0, total, n)]
+    pages = range(total)
+    parts = [_resolve_pages(pages, spec) for spec in (ranges or [])]
+    return [p for p in parts if p]
+
+
+def _shares_resources(pdf: pikepdf.Pdf) -> bool:
+    # a /Resources dictionary shared between pages (or inherited from the page tree) lists fonts and images a part may not use
+    seen = set()
+    for page in pdf.pages:
+        res = page.obj.get("/Resources")
+        if res is None:
+            return True
+        if res.is_indirect:
+            if res.objgen in seen:
+                return True
+            seen.add(res.objgen)
+    return False
+
+
+def _write_part(src: pikepdf.Pdf, pages: list[int], out_pdf: str, prune: bool) -> tuple[int, int]:
+    with pikepdf.new() as dst:
+        # pages copied from one source share a foreign-object map, so fonts and images used by several pages land once
+        dst.pages.extend(src.pages[i] for i in pages)
+        pruned = prune_unused_resources(dst) if prune else 0
+        dst.save(out_pdf, compress_streams=True, object_stream_mode=pikepdf.ObjectStreamMode.generate)
+    return pruned, os.path.getsize(out_pdf)
+
+
+def _worker_write(pages: list[int], out_pdf: str, prune: bool) -> tuple[int, int]:
+    return _write_part(worker_source(), pages, out_pdf, prune)
+
+
+def _write_parts(
+    src: pikepdf.Pdf,
+    src_pdf: Path,
+    plan: list[list[int]],
+    outs: list[str],
+    prune: bool,
+    n: int,
+    progress: Optional[Callable[[int, int], None]],
+    cancel: Optional[threading.Event],
+) -> dict[int, tuple[int, int]]:
+    results: dict[int, tuple[int, int]] = {}
+    try:
+        if n <= 1:
+            for i, pages in enumerate(plan):
+                check_cancel(cancel)
+                results[i] = _write_part(src, pages, outs[i], prune)
+                if progress is not None:
+                    progress(len(results), len(plan))
+        else:
+            ex = ProcessPoolExecutor(max_workers=n, initializer=worker_init, initargs=(pikepdf.open, str(src_pdf)))
+            todo = iter(enumerate(plan))
+            pending: dict[Future, int] = {}
+            try:
+                while True:
+                    pending.update((ex.submit(_worker_write, pages, outs[i], prune), i) for i, pages in islice(todo, n * 2 - len(pending)))
+                    if not pending:
+                        break
+                    check_cancel(cancel)
+                    done, _ = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+                    for fut in done:
+                        results[pending.pop(fut)] = fut.result()
+                        if progress is not None:
+                            progress(len(results), len(plan))
+            finally:
+                # parts still being written when the split is abandoned are removed once their worker is done
+                for fut, i in pending.items():
+                    fut.add_done_callback(lambda _, out=outs[i]: Path(out).unlink(missing_ok=True))
+                stop_pool(ex, pending)
+    except BaseException:
+        # a half-finished split leaves no parts behind
+        for out in outs:
+            Path(out).unlink(missing_ok=True)
+        raise
+    return results
+
+
+def split_pdf(
+    src_pdf: str | Path,
+    out_dir: str | Path,
+    *,
+    ranges: Optional[Iterable[str]] = None,
+    every: Optional[int] = None,
+    name_template: str = "{stem}_part{n:03d}.pdf",
+    workers: Optional[int] = None,
+    report: Optional[dict] = None,
+    progress: Optional[Callable[[int, int], None]] = None,
+    cancel: Optional[threading.Event] = None,
+) -> list[str]:
+    src_pdf = Path(src_pdf)
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    src = pikepdf.open(src_pdf)
+    try:
+        total = len(src.pages)
+        plan = split_plan(total, ranges=ranges, every=every)
+        if not plan:
+            raise ValueError("Не задано ни одной части для разделения")
+        prune = _shares_resources(src)
+        n = default_workers(4) if workers is None else max(1, int(workers))
+        n = min(n, len(plan))
+        if n > 1:
+            # workers open the file themselves
+            src.close()
+        outs = [str(out_dir / name_template.format(stem=src_pdf.stem, n=i + 1, first=p[0] + 1, last=p[-1] + 1)) for i, p in enumerate(plan)]
+        results = _write_parts(src, src_pdf, plan, outs, prune, n, progress, cancel)
+    finally:
+        src.close()
+    if report is not None:
+        report["parts"] = len(plan)
+        report["pages"] = total
+        report["resources_removed"] = sum(r[0] for r in results.values())
+        report["size_before"] = src_pdf.stat().st_size
+        report["size_after"] = sum(r[1] for r in results.values())
+    return outs
@@ -1,7 +1,9 @@
 from __future__ import annotations
 import shutil, subprocess, tempfile, os
 from pathlib import Path
-from typing import Optional
+from concurrent.futures import Executor, Future
+from typing import Any, Callable, Iterable, Optional
+import pikepdf
 
 
 def which(name: str) -> Optional[str]:
@@ -29,3 +31,94 @@ def tmp_path(suffix: str) -> Path:
     fd, p = tempfile.mkstemp(suffix=suffix)
     os.close(fd)
     return Path(p)
+
+
+def rss_mb() -> Optional[float]:
+    mb = 1024 * 1024
+    if os.name == "nt":
+        try:
+            import ctypes
+            from ctypes import wintypes
+
+            class _PMC(ctypes.Structure):
+                _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD)] + [
+                    (n, ctypes.c_size_t) for n in (
+                        "PeakWorkingSetSize", "WorkingSetSize", "QuotaPeakPagedPoolUsage", "QuotaPagedPoolUsage",
+                        "QuotaPeakNonPagedPoolUsage", "QuotaNonPagedPoolUsage", "PagefileUsage", "PeakPagefileUsage",
+                    )
+                ]
+
+            pmc = _PMC()
+            pmc.cb = ctypes.sizeof(pmc)
+            proc = ctypes.windll.kernel32.GetCurrentProcess()
+            if not ctypes.windll.psapi.GetProcessMemoryInfo(proc, ctypes.byref(pmc), pmc.cb):
+                return None
+            return pmc.WorkingSetSize / mb
+        except Exception:
+            return None
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / mb
+    except Exception:
+        # getrusage only knows the lifetime peak (KB on Linux, bytes on macOS), not the current size
+        return None
+
+
+def _safe_strip_metadata(pdf: pikepdf.Pdf, also_names: bool = True) -> None:
+    try:
+        di = getattr(pdf, "docinfo", None)
+        if di:
+            for k in list(di.keys()):
+                try:
+                    del di[k]
+                except Exception:
+                    pass
+        if "/Info" in pdf.trailer:
+            pdf.trailer["/Info"] = pikepdf.Dictionary()
+    except Exception:
+        pass
+    try:
+        if "/Metadata" in pdf.Root:
+            del pdf.Root["/Metadata"]
+    except Exception:
+        pass
+    if also_names:
+        try:
+            if "/Names" in pdf.Root:
+                del pdf.Root["/Names"]
+        except Exception:
+            pass
+
+class OperationCancelled(RuntimeError):
+    pass
+
+
+def check_cancel(cancel) -> None:
+    if cancel is not None and cancel.is_set():
+        raise OperationCancelled("Операция отменена")
+
+
+def default_workers(cap: int = 8) -> int:
+    return max(1, min(cap, os.cpu_count() or 1))
+
+
+# the source a pool worker opened once in its initializer: a fitz or a pikepdf document, whichever the service passed as opener
+_worker_source: Any = None
+
+
+def worker_init(opener: Callable[[str], Any], src_pdf: str) -> None:
+    global _worker_source
+    _worker_source = opener(src_pdf)
+
+
+def worker_source() -> Any:
+    return _worker_source
+
+
+def stop_pool(ex: Executor, pending: Iterable[Future] = (), *, abandon: bool = False) -> None:
+    # on cancel or error, queued tasks are dropped and the few already running (callers keep a bounded
+    # submit window) finish in the background instead of blocking the caller
+    for f in pending:
+        f.cancel()
+        abandon = True
+    ex.shutdown(wait=not abandon, cancel_futures=True)
@@ -108,6 +108,14 @@ class Settings:
     def set_pdf_default_dir(cls, path: str) -> None:
         cls._s.setValue("pdf/default_out_dir", path or "")
 
+    @classmethod
+    def pdf_index_text(cls) -> bool:
+        return cls._s.value("pdf/index_text", True, type=bool)
+
+    @classmethod
+    def set_pdf_index_text(cls, v: bool) -> None:
+        cls._s.setValue("pdf/index_text", bool(v))
+
     @classmethod
     def path_soffice(cls) -> str:
         return cls._s.value("tools/soffice", "", type=str)
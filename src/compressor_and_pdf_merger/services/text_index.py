@@ -0,0 +1,225 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+import os
+import sqlite3
+import fitz
+from platformdirs import user_data_dir
+from compressor_and_pdf_merger.storage.db import APP_NAME, APP_AUTHOR
+from .convert_cache import file_sha256
+
+# page texts go to the index in batches of this size, inside the document's single transaction
+FLUSH_PAGES = 200
+# a document's rows take rowids [doc_id * ROWID_SPAN, (doc_id + 1) * ROWID_SPAN), so it is deleted by a rowid range
+ROWID_SPAN = 1 << 24
+
+
+@dataclass
+class SearchHit:
+    path: str
+    page: int
+    snippet: str
+
+
+def _index_path() -> Path:
+    data_dir = Path(user_data_dir(APP_NAME, APP_AUTHOR))
+    data_dir.mkdir(parents=True, exist_ok=True)
+    return data_dir / "text_index.sqlite3"
+
+
+def _connect(db_path: Optional[Path] = None) -> sqlite3.Connection:
+    # a short-lived connection per call: indexing runs in worker threads while the UI queries
+    conn = sqlite3.connect(db_path or _index_path(), timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL;")
+    conn.execute("PRAGMA synchronous=NORMAL;")
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS docs (
+        id      INTEGER PRIMARY KEY AUTOINCREMENT,
+        sha256  TEXT    NOT NULL UNIQUE,
+        pages   INTEGER NOT NULL,
+        ts      TEXT    NOT NULL
+    );
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS doc_paths (
+        path    TEXT    PRIMARY KEY,
+        doc_id  INTEGER NOT NULL,
+        size    INTEGER NOT NULL,
+        mtime   REAL    NOT NULL
+    );
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_doc_paths_doc ON doc_paths(doc_id);")
+    conn.execute("""
+    CREATE VIRTUAL TABLE IF NOT EXISTS pages_fts USING fts5(
+        text, doc_id UNINDEXED, page UNINDEXED, tokenize = 'unicode61 remove_diacritics 2'
+    );
+    """)
+    if conn.execute("PRAGMA user_version").fetchone()[0] < 1:
+        with conn:
+            # an index built before rowid ranges is renumbered once
+            conn.execute("UPDATE pages_fts SET rowid = doc_id * ? + page", (ROWID_SPAN,))
+            conn.execute("PRAGMA user_version = 1")
+    return conn
+
+
+def _path_key(path: str | Path) -> str:
+    return str(Path(path).resolve())
+
+
+class PageSink:
+    # collects page texts produced elsewhere (e.g. by pdf_to_text) so the PDF is not parsed twice;
+    # nothing is visible to searches until commit, close without commit discards the pages
+    def __init__(self, path: str | Path, sha256: str, db_path: Optional[Path] = None):
+        self.path = Path(path)
+        self.sha256 = sha256
+        self.db_path = db_path
+        self._rows: list[tuple[str, int]] = []
+        self._added = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._doc_id = 0
+        self._known = False
+
+    def add(self, pno: int, text: str) -> None:
+        self._added += 1
+        if text.strip():
+            self._rows.append((text, pno + 1))
+        if len(self._rows) >= FLUSH_PAGES:
+            self._flush()
+
+    def _flush(self) -> None:
+        if self._conn is None:
+            self._conn = _connect(self.db_path)
+            cur = self._conn.execute(
+                "INSERT OR IGNORE INTO docs(sha256, pages, ts) VALUES (?, 0, ?)",
+                (self.sha256, datetime.now().strftime("%Y-%m-%d %H:%M:%S")),
+            )
+            # indexed by someone else meanwhile: only the path gets linked
+            self._known = not cur.rowcount
+            self._doc_id = self._conn.execute("SELECT id FROM docs WHERE sha256 = ?", (self.sha256,)).fetchone()[0]
+        if not self._known:
+            base = self._doc_id * ROWID_SPAN
+            self._conn.executemany(
+                "INSERT INTO pages_fts(rowid, text, doc_id, page) VALUES (?, ?, ?, ?)",
+                ((base + page, text, self._doc_id, page) for text, page in self._rows),
+            )
+        self._rows.clear()
+
+    def commit(self, pages: int) -> int:
+        try:
+            self._flush()
+            if not self._known:
+                self._conn.execute("UPDATE docs SET pages = ? WHERE id = ?", (pages, self._doc_id))
+            _remember_path(self._conn, self.path, self._doc_id)
+            self._conn.commit()
+        finally:
+            self.close()
+        return self._added
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+        self._rows.clear()
+
+
+def _remember_path(conn: sqlite3.Connection, path: Path, doc_id: int) -> None:
+    st = path.stat()
+    conn.execute(
+        "INSERT OR REPLACE INTO doc_paths(path, doc_id, size, mtime) VALUES (?, ?, ?, ?)",
+        (_path_key(path), doc_id, st.st_size, st.st_mtime),
+    )
+
+
+def page_sink(path: str | Path, db_path: Optional[Path] = None) -> Optional[PageSink]:
+    # None when this content is already indexed; the path is still linked to it
+    sha = file_sha256(path)
+    conn = _connect(db_path)
+    try:
+        row = conn.execute("SELECT id FROM docs WHERE sha256 = ?", (sha,)).fetchone()
+        if row is not None:
+            with conn:
+                _remember_path(conn, Path(path), row[0])
+            return None
+    finally:
+        conn.close()
+    return PageSink(path, sha, db_path)
+
+
+def index_pdf(path: str | Path, *, text_source: str | Path | None = None, db_path: Optional[Path] = None) -> int:
+    # text_source lets a rasterized output be found by the text of its original; returns the number of pages indexed
+    sink = page_sink(path, db_path)
+    if sink is None:
+        return 0
+    try:
+        with fitz.open(str(text_source or path)) as doc:
+            for page in doc:
+                sink.add(page.number, page.get_text("text"))
+            return sink.commit(len(doc))
+    finally:
+        sink.close()
+
+
+def _fts_query(query: str) -> str:
+    # free text -> AND of quoted terms, the last one as a prefix, so FTS syntax characters are never interpreted
+    terms = [t.replace('"', '""') for t in query.split()]
+    if not terms:
+        return ""
+    return " ".join(f'"{t}"' for t in terms[:-1]) + (" " if len(terms) > 1 else "") + f'"{terms[-1]}"*'
+
+
+def search(query: str, *, limit: int = 50, db_path: Optional[Path] = None) -> list[SearchHit]:
+    match = _fts_query(query)
+    if not match:
+        return []
+    conn = _connect(db_path)
+    try:
+        rows = conn.execute(
+            """
+            SELECT p.path, p.size, p.mtime, f.page, snippet(pages_fts, 0, '[', ']', '…', 12)
+            FROM pages_fts AS f JOIN doc_paths AS p ON p.doc_id = f.doc_id
+            WHERE pages_fts MATCH ?
+            ORDER BY bm25(pages_fts)
+            LIMIT ?
+            """,
+            (match, int(limit)),
+        ).fetchall()
+    finally:
+        conn.close()
+    # a path deleted or overwritten since indexing no longer holds that text; prune_index forgets it for good
+    return [SearchHit(path, int(page), " ".join(snip.split())) for path, size, mtime, page, snip in rows if _unchanged(path, size, mtime)]
+
+
+def _unchanged(path: str, size: int, mtime: float) -> bool:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return False
+    return st.st_size == size and st.st_mtime == mtime
+
+
+def prune_index(db_path: Optional[Path] = None) -> int:
+    # forget paths that were deleted or changed since indexing, then documents no path points to
+    conn = _connect(db_path)
+    try:
+        stale = [(path,) for path, size, mtime in conn.execute("SELECT path, size, mtime FROM doc_paths").fetchall() if not _unchanged(path, size, mtime)]
+        with conn:
+            conn.executemany("DELETE FROM doc_paths WHERE path = ?", stale)
+            orphans = [r[0] for r in conn.execute("SELECT id FROM docs WHERE id NOT IN (SELECT doc_id FROM doc_paths)")]
+            conn.executemany("DELETE FROM pages_fts WHERE rowid >= ? AND rowid < ?", ((d * ROWID_SPAN, (d + 1) * ROWID_SPAN) for d in orphans))
+            conn.executemany("DELETE FROM docs WHERE id = ?", ((d,) for d in orphans))
+    finally:
+        conn.close()
+    return len(stale)
+
+
+def index_stats(db_path: Optional[Path] = None) -> dict:
+    conn = _connect(db_path)
+    try:
+        docs, pages = conn.execute("SELECT COUNT(*), COALESCE(SUM(pages), 0) FROM docs").fetchone()
+        paths = conn.execute("SELECT COUNT(*) FROM doc_paths").fetchone()[0]
+    finally:
+        conn.close()
+    return {"docs": docs, "pages": pages, "paths": paths}
+
@@ -0,0 +1,196 @@
+from __future__ import annotations
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Callable, Optional
+import atexit
+import hashlib
+import io
+import os
+import threading
+import fitz
+from PIL import Image, ImageOps
+from platformdirs import user_cache_dir
+from compressor_and_pdf_merger.storage.db import APP_NAME, APP_AUTHOR
+from .disk_cache import DiskCache
+
+THUMB_DPI = 20
+# images get the same long side as an A4 page at THUMB_DPI
+THUMB_MAX_SIDE = round(297 / 25.4 * THUMB_DPI)
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+IMAGE_EXT = {".jpg", ".jpeg", ".png", ".webp", ".tif", ".tiff", ".bmp"}
+
+ThumbCallback = Callable[[str, int, Optional[bytes]], None]
+
+
+def thumb_key(path: str | Path, page: int = 0, dpi: int = THUMB_DPI) -> str:
+    # size and mtime stand in for the content: thumbnails must be found without reading the file
+    st = os.stat(path)
+    return hashlib.sha256(f"{Path(path).resolve()}|{st.st_size}|{st.st_mtime_ns}|{page}|{dpi}".encode("utf-8")).hexdigest()
+
+
+def render_thumbnail(path: str, page: int = 0, dpi: int = THUMB_DPI) -> Optional[bytes]:
+    ext = Path(path).suffix.lower()
+    if ext == ".pdf":
+        with fitz.open(path) as doc:
+            if page >= len(doc):
+                return None
+            pix = doc.load_page(page).get_pixmap(matrix=fitz.Matrix(dpi / 72.0, dpi / 72.0), alpha=False)
+            return pix.tobytes("png")
+    if ext in IMAGE_EXT:
+        with Image.open(path) as im:
+            im.draft("RGB", (THUMB_MAX_SIDE, THUMB_MAX_SIDE))
+            im = ImageOps.exif_transpose(im).convert("RGB")
+            im.thumbnail((THUMB_MAX_SIDE, THUMB_MAX_SIDE))
+            bio = io.BytesIO()
+            im.save(bio, "PNG")
+            return bio.getvalue()
+    # office files would need a full conversion first
+    return None
+
+
+class ThumbnailCache(DiskCache):
+    def __init__(self, root: str | Path, max_bytes: int = DEFAULT_MAX_BYTES):
+        super().__init__(root, ".png", max_bytes)
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._read(key, Path.read_bytes)
+
+    def put(self, key: str, data: bytes) -> None:
+        self._store(key, lambda part: part.write_bytes(data))
+
+
+class ThumbnailService:
+    def __init__(self, cache: Optional[ThumbnailCache] = None, *, dpi: int = THUMB_DPI, workers: int = 2):
+        self.cache = cache or ThumbnailCache(Path(user_cache_dir(APP_NAME, APP_AUTHOR)) / "thumbnails")
+        self.dpi = int(dpi)
+        self.workers = max(1, int(workers))
+        self.stats = {"hits": 0, "rendered": 0, "failed": 0}
+        self._ex: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.RLock()
+        # newest request first: the rows the user is looking at right now win over ones already scrolled past
+        self._queue: list[tuple[str, str, int]] = []
+        self._callbacks: dict[str, list[ThumbCallback]] = {}
+        self._retried: set[str] = set()
+        self._inflight = 0
+        self._closed = False
+
+    def request(self, path: str | Path, page: int = 0, callback: Optional[ThumbCallback] = None) -> None:
+        path = str(path)
+        try:
+            key = thumb_key(path, page, self.dpi)
+        except OSError:
+            if callback is not None:
+                callback(path, page, None)
+            return
+        data = self.cache.get(key)
+        if data is not None:
+            with self._lock:
+                self.stats["hits"] += 1
+            if callback is not None:
+                callback(path, page, data)
+            return
+        with self._lock:
+            known = key in self._callbacks
+            waiting = self._callbacks.setdefault(key, [])
+            if callback is not None:
+                waiting.append(callback)
+            if known:
+                # still queued: asked again, so it moves to the front
+                for i, entry in enumerate(self._queue):
+                    if entry[0] == key:
+                        self._queue.append(self._queue.pop(i))
+                        break
+                return
+            self._queue.append((key, path, page))
+            self._closed = False
+            self._pump()
+
+    def _pump(self) -> None:
+        # caller holds self._lock
+        while self._queue and self._inflight < self.workers:
+            key, path, page = self._queue.pop()
+            if self._ex is None:
+                self._ex = ProcessPoolExecutor(max_workers=self.workers)
+            try:
+                fut = self._ex.submit(render_thumbnail, path, page, self.dpi)
+            except Exception:
+                # a crashed worker breaks the pool for good: the next iteration starts a fresh one, and this job gets one retry there
+                ex, self._ex = self._ex, None
+                ex.shutdown(wait=False, cancel_futures=True)
+                if key not in self._retried:
+                    self._retried.add(key)
+                    self._queue.append((key, path, page))
+                    continue
+                self._retried.discard(key)
+                self._callbacks.pop(key, None)
+                self.stats["failed"] += 1
+                continue
+            self._inflight += 1
+            fut.add_done_callback(lambda f, key=key, path=path, page=page, ex=self._ex: self._done(key, path, page, ex, f))
+
+    def _done(self, key: str, path: str, page: int, ex: ProcessPoolExecutor, fut: Future) -> None:
+        broken = False
+        try:
+            data = fut.result()
+        except BrokenProcessPool:
+            data, broken = None, True
+        except Exception:
+            data = None
+        if data is not None:
+            self.cache.put(key, data)
+        callbacks: list[ThumbCallback] = []
+        with self._lock:
+            self._inflight -= 1
+            if broken and self._ex is ex:
+                # a crashed worker breaks the whole pool; the next _pump starts a fresh one
+                self._ex = None
+                ex.shutdown(wait=False, cancel_futures=True)
+            if broken and not self._closed and key not in self._retried:
+                # the file may not be the culprit (another job crashed the pool), so it gets one more try
+                self._retried.add(key)
+                self._queue.append((key, path, page))
+            else:
+                self._retried.discard(key)
+                self.stats["rendered" if data is not None else "failed"] += 1
+                callbacks = self._callbacks.pop(key, [])
+            if not self._closed:
+                self._pump()
+        for cb in callbacks:
+            try:
+                cb(path, page, data)
+            except Exception:
+                pass
+
+    def shutdown(self) -> None:
+        with self._lock:
+            self._closed = True
+            self._queue.clear()
+            self._callbacks.clear()
+            self._retried.clear()
+            ex, self._ex = self._ex, None
+        if ex is not None:
+            ex.shutdown(wait=False, cancel_futures=True)
+
+
+_service: Optional[ThumbnailService] = None
+_service_lock = threading.Lock()
+
+
+def get_thumbnail_service() -> ThumbnailService:
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = ThumbnailService()
+        return _service
+
+
+def shutdown_thumbnails() -> None:
+    global _service
+    with _service_lock:
+        if _service is not None:
+            _service.shutdown()
+            _service = None
+
+
+atexit.register(shutdown_thumbnails)
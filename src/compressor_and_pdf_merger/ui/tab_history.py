@@ -1,15 +1,29 @@
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QLabel,
-    QListWidget, QPushButton, QHBoxLayout
+    QListWidget, QListWidgetItem, QPushButton, QHBoxLayout, QLineEdit
 )
-from PyQt6.QtCore import QDateTime, Qt
+from PyQt6.QtCore import QDateTime, Qt, QUrl
+from PyQt6.QtGui import QDesktopServices
 from compressor_and_pdf_merger.storage import db
+from compressor_and_pdf_merger.services import text_index
+
+SEARCH_HINT = "Поиск по тексту обработанных PDF"
+
 
 class HistoryTab(QWidget):
     def __init__(self):
         super().__init__()
         layout = QVBoxLayout(self)
 
+        self.ed_search = QLineEdit()
+        self.ed_search.setPlaceholderText(SEARCH_HINT + "...")
+        self.ed_search.setClearButtonEnabled(True)
+        self.search_list = QListWidget()
+        self.search_list.setWordWrap(True)
+        self.search_list.hide()
+        layout.addWidget(self.ed_search)
+        layout.addWidget(self.search_list)
+
         self.empty_lbl = QLabel("Пока вы не производили никаких действий.")
         self.list = QListWidget()
         self.list.hide()
@@ -29,6 +43,48 @@ class HistoryTab(QWidget):
         layout.addLayout(btn_row)
 
         self.btn_clear.clicked.connect(self.clear_history)
+        self.ed_search.textChanged.connect(self._on_search)
+        self.search_list.itemDoubleClicked.connect(self._open_hit)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self._refresh_index()
+
+    def _refresh_index(self):
+        # outputs deleted or overwritten since they were indexed are forgotten, so the index does not grow without bound
+        try:
+            text_index.prune_index()
+            stats = text_index.index_stats()
+        except Exception:
+            return
+        if stats["docs"]:
+            self.ed_search.setPlaceholderText(f"{SEARCH_HINT} (файлов: {stats['paths']}, страниц: {stats['pages']})...")
+        else:
+            self.ed_search.setPlaceholderText(SEARCH_HINT + "...")
+
+    def _on_search(self, text: str):
+        self.search_list.clear()
+        if not text.strip():
+            self.search_list.hide()
+            return
+        self.search_list.show()
+        try:
+            hits = text_index.search(text, limit=100)
+        except Exception as e:
+            self.search_list.addItem(f"Ошибка поиска: {e}")
+            return
+        if not hits:
+            self.search_list.addItem("Ничего не найдено.")
+            return
+        for hit in hits:
+            item = QListWidgetItem(f"{hit.path} — стр. {hit.page}\n{hit.snippet}")
+            item.setData(Qt.ItemDataRole.UserRole, hit.path)
+            self.search_list.addItem(item)
+
+    def _open_hit(self, item: QListWidgetItem):
+        path = item.data(Qt.ItemDataRole.UserRole)
+        if path:
+            QDesktopServices.openUrl(QUrl.fromLocalFile(path))
 
     def add_entry(self, text: str):
         ts = QDateTime.currentDateTime().toString("yyyy-MM-dd HH:mm:ss")
@@ -1,12 +1,14 @@
 from __future__ import annotations
 from pathlib import Path
 from os.path import isfile
-from PyQt6.QtCore import pyqtSignal
+from PyQt6.QtCore import pyqtSignal, QThread
 from PyQt6.QtWidgets import (
-    QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QFileDialog,
+    QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QFileDialog, QListWidget, QProgressDialog,
     QLineEdit, QLabel, QComboBox, QSpinBox, QCheckBox, QMessageBox, QGroupBox, QFormLayout
 )
-from compressor_and_pdf_merger.services.pdf_compress import compress_pdf
+from compressor_and_pdf_merger.services.pdf_compress import compress_pdf_batch
+from compressor_and_pdf_merger.services.pdf_analyze import analyze_pdf, PdfBudget
+from compressor_and_pdf_merger.ui.worker import CallWorker, IterWorker
 from compressor_and_pdf_merger.storage import db
 from compressor_and_pdf_merger.services.settings import Settings
 
@@ -22,17 +24,35 @@ class PdfCompressTab(QWidget):
         self.ed_in = QLineEdit()
         self.ed_in.setPlaceholderText("Выберите PDF...")
         self.btn_in = QPushButton("Обзор...")
+        self.btn_batch = QPushButton("Пакет...")
         in_row.addWidget(self.ed_in, 1)
         in_row.addWidget(self.btn_in)
+        in_row.addWidget(self.btn_batch)
         root.addLayout(in_row)
 
+        self.list_batch = QListWidget()
+        self.list_batch.setSelectionMode(QListWidget.SelectionMode.ExtendedSelection)
+        self.btn_batch_del = QPushButton("Удалить выбранные")
+        self.btn_batch_clear = QPushButton("Очистить пакет")
+        batch_btns = QHBoxLayout()
+        batch_btns.addWidget(self.btn_batch_del)
+        batch_btns.addWidget(self.btn_batch_clear)
+        root.addWidget(self.list_batch)
+        root.addLayout(batch_btns)
+        self._batch_widgets = [self.list_batch, self.btn_batch_del, self.btn_batch_clear]
+        for w in self._batch_widgets:
+            w.setVisible(False)
+
         grp = QGroupBox("Параметры сжатия")
         form = QFormLayout(grp)
 
         self.cmb_mode = QComboBox()
-        self.cmb_mode.addItems(["Растрировать страницы (встроенное)", "Бережное (без потерь)"])
+        self.cmb_mode.addItems(["Растрировать страницы (встроенное)", "Бережное (без потерь)", "MRC: чёткий текст + сжатый фон (цветные сканы)"])
         self.cmb_mode.setCurrentIndex(0)
         form.addRow(QLabel("Режим:"), self.cmb_mode)
+        self.lbl_hint = QLabel("")
+        self.lbl_hint.setWordWrap(True)
+        form.addRow(self.lbl_hint)
 
         self.sp_target_pct = QSpinBox()
         self.sp_target_pct.setRange(0, 99)
@@ -50,6 +70,11 @@ class PdfCompressTab(QWidget):
         form.addRow(QLabel("Целевой DPI:"), self.sp_dpi)
         form.addRow(QLabel("JPEG качество:"), self.sp_jpgq)
         form.addRow(self.cb_gray)
+        self.cb_auto_gray = QCheckBox("Страницы без цвета — в оттенках серого (авто)")
+        self.cb_auto_gray.setChecked(True)
+        form.addRow(self.cb_auto_gray)
+        self.cb_bitonal = QCheckBox("Ч/Б страницы в 1 бит (CCITT G4)")
+        form.addRow(self.cb_bitonal)
 
         self.cb_strip = QCheckBox("Удалить метаданные/вложения")
         self.cb_strip.setChecked(True)
@@ -57,6 +82,9 @@ class PdfCompressTab(QWidget):
         self.cb_ensure = QCheckBox("Не больше исходного")
         self.cb_ensure.setChecked(True)
         form.addRow(self.cb_ensure)
+        # off by default: linearization changes the file layout, so output differs from a plain compress
+        self.cb_linearize = QCheckBox("Быстрый веб-просмотр (линеаризация)")
+        form.addRow(self.cb_linearize)
 
         root.addWidget(grp)
 
@@ -77,19 +105,60 @@ class PdfCompressTab(QWidget):
         root.addWidget(self.btn_go)
 
         self.btn_in.clicked.connect(self._choose_in)
+        self.btn_batch.clicked.connect(self._choose_batch)
+        self.btn_batch_del.clicked.connect(self._batch_del)
+        self.btn_batch_clear.clicked.connect(self._batch_clear)
         self.btn_out.clicked.connect(self._choose_out)
         self.btn_go.clicked.connect(self._on_go)
         self.ed_in.textChanged.connect(self._auto_out_name)
+        self.ed_in.textChanged.connect(self._analyze_input)
         self.cmb_mode.currentIndexChanged.connect(self._toggle_fields)
+        self.cb_gray.toggled.connect(lambda _: self._toggle_fields(self.cmb_mode.currentIndex()))
         self._toggle_fields(self.cmb_mode.currentIndex())
 
 
     def _toggle_fields(self, idx: int):
-        is_raster = idx == 0
+        is_raster = idx != 1
         self.sp_target_pct.setEnabled(is_raster)
         self.sp_dpi.setEnabled(is_raster)
         self.sp_jpgq.setEnabled(is_raster)
         self.cb_gray.setEnabled(is_raster)
+        self.cb_auto_gray.setEnabled(is_raster and not self.cb_gray.isChecked())
+        self.cb_bitonal.setEnabled(is_raster)
+
+
+    def _analyze_input(self, txt: str):
+        self.lbl_hint.setText("")
+        if not (txt and txt.lower().endswith(".pdf") and isfile(txt)):
+            return
+        self.lbl_hint.setText("Анализ файла...")
+        thread = QThread(self)
+        worker = CallWorker(lambda: analyze_pdf(txt))
+        worker.moveToThread(thread)
+
+        def on_done(b: PdfBudget):
+            if self.ed_in.text() != txt:
+                return
+            names = {"images": "растрирование", "lossless": "бережное", "mrc": "MRC"}
+            total = max(1, b.file_size)
+            parts = ", ".join(f"{k} {v * 100 // total}%" for k, v in sorted(b.categories.items(), key=lambda kv: -kv[1]) if v * 100 // total)
+            self.lbl_hint.setText(f"Рекомендуемый режим: {names.get(b.recommended_mode, b.recommended_mode)} — {b.reason}.\nСостав файла: {parts}")
+
+        def on_fail(err: str):
+            if self.ed_in.text() == txt:
+                self.lbl_hint.setText("")
+
+        def on_finished():
+            thread.quit()
+            thread.wait()
+            worker.deleteLater()
+            thread.deleteLater()
+
+        worker.done.connect(on_done)
+        worker.failed.connect(on_fail)
+        worker.finished.connect(on_finished)
+        thread.started.connect(worker.run)
+        thread.start()
 
 
     def _default_out_for(self, in_path: str) -> str:
@@ -112,6 +181,47 @@ class PdfCompressTab(QWidget):
             self.ed_in.setText(fn)
 
 
+    def _choose_batch(self):
+        files, _ = QFileDialog.getOpenFileNames(self, "Выбрать PDF", "", "PDF (*.pdf)")
+        for f in files:
+            self.list_batch.addItem(f)
+        self._update_batch_visibility()
+
+
+    def _batch_del(self):
+        for it in self.list_batch.selectedItems():
+            self.list_batch.takeItem(self.list_batch.row(it))
+        self._update_batch_visibility()
+
+
+    def _batch_clear(self):
+        self.list_batch.clear()
+        self._update_batch_visibility()
+
+
+    def _update_batch_visibility(self):
+        has_batch = self.list_batch.count() > 0
+        for w in self._batch_widgets:
+            w.setVisible(has_batch)
+        self.ed_in.setEnabled(not has_batch)
+        self.btn_in.setEnabled(not has_batch)
+        self.ed_out.setPlaceholderText("Папка для результатов (пусто — рядом с исходниками)" if has_batch else "Куда сохранить...")
+
+
+    def _batch_jobs(self) -> list[tuple[str, str]]:
+        out_dir = self.ed_out.text().strip()
+        if out_dir.lower().endswith(".pdf"):
+            out_dir = str(Path(out_dir).parent)
+        jobs = []
+        for i in range(self.list_batch.count()):
+            src = self.list_batch.item(i).text()
+            dst = self._default_out_for(src)
+            if out_dir:
+                dst = str(Path(out_dir) / Path(dst).name)
+            jobs.append((src, dst))
+        return jobs
+
+
     def _choose_out(self):
         base = self._default_out_for(self.ed_in.text().strip()) if self.ed_in.text().strip() else "compressed.pdf"
         fn, _ = QFileDialog.getSaveFileName(self, "Сохранить как", base, "PDF (*.pdf)")
@@ -121,31 +231,108 @@ class PdfCompressTab(QWidget):
             self.ed_out.setText(fn)
 
 
+    def _options(self) -> dict:
+        return dict(
+            mode=("images", "lossless", "mrc")[self.cmb_mode.currentIndex()],
+            target_dpi=self.sp_dpi.value(),
+            jpeg_quality=self.sp_jpgq.value(),
+            grayscale=self.cb_gray.isChecked(),
+            auto_grayscale=self.cb_auto_gray.isChecked(),
+            strip_metadata=self.cb_strip.isChecked(),
+            ensure_not_larger=self.cb_ensure.isChecked(),
+            linearize=self.cb_linearize.isChecked(),
+            target_percent=(self.sp_target_pct.value() or None),
+            bitonal=self.cb_bitonal.isChecked(),
+            index=Settings.pdf_index_text(),
+        )
+
+
+    def _result_text(self, mode: str, res: str, report: dict) -> str:
+        mode_name = {"images": "растр", "lossless": "без потерь", "mrc": "MRC"}[mode]
+        text = f"PDF: сжатие ({mode_name}) → \"{res}\""
+        if report.get("size_before"):
+            text += f"\n{report['size_before'] / 1024:.0f} КБ → {report['size_after'] / 1024:.0f} КБ"
+        if report.get("linearized"):
+            before = report.get("first_page_before", {}).get("first_page_bytes")
+            text += f"\nПервая страница: {report['first_page_bytes'] / 1024:.0f} КБ"
+            if before:
+                text += f" (было {before / 1024:.0f} КБ)"
+        if report.get("gray_pages"):
+            text += f"\nСерых страниц: {report['gray_pages']} из {report['pages']}"
+        if report.get("peak_rss_mb"):
+            text += f" (пик памяти: {report['peak_rss_mb']:.0f} МБ)"
+        if report.get("savings"):
+            names = {"images": "изображения", "fonts": "шрифты", "streams": "потоки"}
+            parts = [f"{names[c]} {sum(v.values()) / 1024:.0f} КБ" for c, v in report["savings"].items() if sum(v.values())]
+            if parts:
+                text += "\nЭкономия: " + ", ".join(parts)
+        return text
+
+
     def _on_go(self):
-        src = self.ed_in.text().strip()
-        dst = self.ed_out.text().strip()
-        if not (src and isfile(src)):
-            QMessageBox.warning(self, "Нет файла", "Выберите входной PDF.")
-            return
-        if not dst:
-            QMessageBox.warning(self, "Нет пути", "Укажите путь сохранения.")
-            return
-        try:
-            mode = "images" if self.cmb_mode.currentIndex() == 0 else "lossless"
-            res = compress_pdf(
-                src,
-                dst,
-                mode=mode,
-                target_dpi=self.sp_dpi.value(),
-                jpeg_quality=self.sp_jpgq.value(),
-                grayscale=self.cb_gray.isChecked(),
-                strip_metadata=self.cb_strip.isChecked(),
-                ensure_not_larger=self.cb_ensure.isChecked(),
-                target_percent=(self.sp_target_pct.value() or None),
-            )
-            text = f"PDF: сжатие ({'растр' if mode=='images' else 'без потерь'}) → \"{res}\""
+        if self.list_batch.count() > 0:
+            jobs = self._batch_jobs()
+        else:
+            src = self.ed_in.text().strip()
+            dst = self.ed_out.text().strip()
+            if not (src and isfile(src)):
+                QMessageBox.warning(self, "Нет файла", "Выберите входной PDF.")
+                return
+            if not dst:
+                QMessageBox.warning(self, "Нет пути", "Укажите путь сохранения.")
+                return
+            jobs = [(src, dst)]
+        opts = self._options()
+        self._run_jobs(jobs, opts)
+
+
+    def _run_jobs(self, jobs: list[tuple[str, str]], opts: dict):
+        self.btn_go.setEnabled(False)
+        dialog = QProgressDialog("Сжатие PDF...", "Отмена", 0, 100, self)
+        dialog.setWindowTitle("Сжатие PDF")
+        dialog.setAutoClose(False)
+        dialog.setAutoReset(False)
+        dialog.setValue(0)
+
+        thread = QThread(self)
+        worker = IterWorker(lambda progress, cancel: compress_pdf_batch(jobs, progress=progress, cancel=cancel, **opts))
+        worker.moveToThread(thread)
+        ok: list[str] = []
+        fail: list[str] = []
+
+        def on_item(item):
+            src, res, err, report = item
+            if err is not None:
+                fail.append(f"{Path(src).name} - {err}")
+                return
+            text = self._result_text(opts["mode"], res, report)
+            ok.append(text)
             self.entry_logged.emit(text)
             db.add_history(tab="PDF", action="Сжатие", src_name=Path(src).name, out_path=res)
-            QMessageBox.information(self, "Готово", text)
-        except Exception as e:
-            QMessageBox.critical(self, "Ошибка", str(e))
+
+        def on_finished():
+            cancelled = worker.is_cancelled()
+            dialog.canceled.disconnect(worker.cancel)
+            dialog.close()
+            self.btn_go.setEnabled(True)
+            thread.quit()
+            thread.wait()
+            worker.deleteLater()
+            thread.deleteLater()
+            if cancelled:
+                QMessageBox.information(self, "Отменено", f"Сжатие отменено. Готово файлов: {len(ok)}.")
+            elif fail:
+                QMessageBox.warning(self, "Завершено с ошибками", f"Успешно: {len(ok)}\nОшибки:\n" + "\n".join(fail))
+            elif len(ok) == 1:
+                QMessageBox.information(self, "Готово", ok[0])
+            else:
+                QMessageBox.information(self, "Готово", f"Сжато файлов: {len(ok)}")
+
+        worker.progress.connect(dialog.setValue)
+        worker.item.connect(on_item)
+        worker.failed.connect(lambda err: fail.append(err))
+        worker.finished.connect(on_finished)
+        dialog.canceled.connect(worker.cancel)
+        thread.started.connect(worker.run)
+        thread.start()
+        dialog.show()
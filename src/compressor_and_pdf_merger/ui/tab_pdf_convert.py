@@ -1,16 +1,19 @@
 from __future__ import annotations
 from pathlib import Path
 from os.path import isfile, isdir
-from PyQt6.QtCore import pyqtSignal
+from PyQt6.QtCore import pyqtSignal, QThread, Qt
+from PyQt6.QtGui import QPixmap
 from PyQt6.QtWidgets import (
-    QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QFileDialog,
-    QLineEdit, QLabel, QComboBox, QSpinBox, QMessageBox, QGroupBox, QFormLayout
+    QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QFileDialog, QProgressDialog,
+    QLineEdit, QLabel, QComboBox, QSpinBox, QMessageBox, QGroupBox, QFormLayout, QCheckBox
 )
 from compressor_and_pdf_merger.services.pdf_convert import (
     pdf_to_images, pdf_to_pptx_snapshots, pdf_to_text
 )
+from compressor_and_pdf_merger.services.pdf_split import split_pdf
 from compressor_and_pdf_merger.storage import db
 from compressor_and_pdf_merger.services.settings import Settings
+from compressor_and_pdf_merger.ui.worker import TaskWorker, ThumbnailLoader
 
 
 
@@ -29,22 +32,50 @@ class PdfConvertTab(QWidget):
         in_row.addWidget(self.btn_in)
         root.addLayout(in_row)
 
+        self.lbl_preview = QLabel()
+        self.lbl_preview.setFixedHeight(120)
+        self.lbl_preview.setAlignment(Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter)
+        self.lbl_preview.hide()
+        root.addWidget(self.lbl_preview)
+        self._thumbs = ThumbnailLoader(self)
+        self._thumbs.ready.connect(self._on_thumb)
+
         grp = QGroupBox("Конвертация")
         form = QFormLayout(grp)
 
         self.cmb_kind = QComboBox()
-        self.cmb_kind.addItems(["Изображения (JPG)", "Изображения (PNG)", "PPTX (снимки)", "TXT"])
+        self.cmb_kind.addItems(["Изображения (JPG)", "Изображения (PNG)", "Изображения (TIFF)", "PPTX (снимки)", "TXT", "Разделить PDF"])
         form.addRow(QLabel("Формат:"), self.cmb_kind)
 
         self.ed_range = QLineEdit()
         self.ed_range.setPlaceholderText("Диапазон страниц, напр. 1-3,5")
         form.addRow(QLabel("Диапазон:"), self.ed_range)
 
+        self.sp_every = QSpinBox()
+        self.sp_every.setRange(0, 10000)
+        self.sp_every.setValue(0)
+        self.sp_every.setSpecialValueText("по диапазонам (части через «;», напр. 1-3; 4-10; 11-)")
+        form.addRow(QLabel("Разделить каждые N страниц:"), self.sp_every)
+
         self.sp_dpi = QSpinBox()
         self.sp_dpi.setRange(72, 600)
         self.sp_dpi.setValue(144)
         form.addRow(QLabel("DPI (для изображений/слайдов):"), self.sp_dpi)
 
+        self.sp_quality = QSpinBox()
+        self.sp_quality.setRange(0, 100)
+        self.sp_quality.setValue(85)
+        self.sp_quality.setSpecialValueText("без потерь (PNG)")
+        form.addRow(QLabel("Качество JPEG (для слайдов):"), self.sp_quality)
+
+        self.cmb_text_mode = QComboBox()
+        self.cmb_text_mode.addItem("Обычный текст", "plain")
+        self.cmb_text_mode.addItem("По блокам (абзацы)", "blocks")
+        self.cmb_text_mode.addItem("По словам (строки)", "words")
+        self.cb_per_page = QCheckBox("Отдельный файл на каждую страницу")
+        form.addRow(QLabel("Режим текста (TXT):"), self.cmb_text_mode)
+        form.addRow(self.cb_per_page)
+
         out_row = QHBoxLayout()
         self.ed_out = QLineEdit()
         self.ed_out.setPlaceholderText("Папка/файл для сохранения...")
@@ -62,6 +93,7 @@ class PdfConvertTab(QWidget):
         self.btn_out.clicked.connect(self._choose_out)
         self.btn_go.clicked.connect(self._on_go)
         self.ed_in.textChanged.connect(lambda _: self._auto_out_name())
+        self.ed_in.textChanged.connect(lambda _: self._request_preview())
         self.cmb_kind.currentTextChanged.connect(lambda _: self._auto_out_name())
 
         if Settings and hasattr(Settings, "pdf_default_dir"):
@@ -75,6 +107,22 @@ class PdfConvertTab(QWidget):
         return Path(t) if t and isfile(t) else None
 
 
+    def _request_preview(self):
+        self.lbl_preview.hide()
+        src = self._src()
+        if src:
+            self._thumbs.request(str(src))
+
+
+    def _on_thumb(self, path: str, page: int, data: bytes):
+        src = self._src()
+        pm = QPixmap()
+        if src is None or str(src) != path or not pm.loadFromData(data):
+            return
+        self.lbl_preview.setPixmap(pm.scaledToHeight(self.lbl_preview.height(), Qt.TransformationMode.SmoothTransformation))
+        self.lbl_preview.show()
+
+
     def _default_out_for(self) -> str:
         src = self._src()
         if not src:
@@ -85,10 +133,14 @@ class PdfConvertTab(QWidget):
             return str(src.with_name(f"{stem}_images_jpg"))
         if kind == "Изображения (PNG)":
             return str(src.with_name(f"{stem}_images_png"))
+        if kind == "Изображения (TIFF)":
+            return str(src.with_name(f"{stem}_images_tif"))
         if kind == "PPTX (снимки)":
             return str(src.with_name(f"{stem}_converted.pptx"))
         if kind == "TXT":
             return str(src.with_name(f"{stem}_converted.txt"))
+        if kind == "Разделить PDF":
+            return str(src.with_name(f"{stem}_parts"))
         return str(src.with_name(f"{stem}_converted"))
 
 
@@ -113,7 +165,7 @@ class PdfConvertTab(QWidget):
             return
         default = self._default_out_for()
         kind = self.cmb_kind.currentText()
-        if "Изображения" in kind:
+        if "Изображения" in kind or kind == "Разделить PDF":
             d = QFileDialog.getExistingDirectory(self, "Папка назначения", default)
             if d:
                 self.ed_out.setText(d)
@@ -139,30 +191,113 @@ class PdfConvertTab(QWidget):
         kind = self.cmb_kind.currentText()
         rng = self.ed_range.text().strip() or None
         dpi = int(self.sp_dpi.value())
-        try:
-            if kind.startswith("Изображения"):
-                out_dir = self.ed_out.text().strip() or self._default_out_for()
-                fmt = "jpg" if "JPG" in kind else "png"
-                files = pdf_to_images(src, out_dir, fmt=fmt, dpi=dpi, page_range=rng)
+        if kind.startswith("Изображения"):
+            out_dir = self.ed_out.text().strip() or self._default_out_for()
+            fmt = "jpg" if "JPG" in kind else "tif" if "TIFF" in kind else "png"
+
+            def job(progress, cancel):
+                return pdf_to_images(src, out_dir, fmt=fmt, dpi=dpi, page_range=rng, progress=progress, cancel=cancel)
+
+            def done(files):
                 text = f"PDF→{fmt.upper()}: {len(files)} файлов в \"{out_dir}\""
-                self.entry_logged.emit(text)
                 db.add_history(tab="PDF", action=f"Convert → {fmt.upper()}", src_name=src.name, out_path=out_dir)
-                QMessageBox.information(self, "Готово", text)
-            elif kind == "PPTX (снимки)":
-                out_file = self.ed_out.text().strip() or self._default_out_for()
-                if not out_file.lower().endswith(".pptx"):
-                    out_file += ".pptx"
-                res = pdf_to_pptx_snapshots(src, out_file, dpi=dpi)
-                text = f"PDF→PPTX (снимки): \"{res}\""
-                self.entry_logged.emit(text)
+                return text
+        elif kind == "PPTX (снимки)":
+            out_file = self.ed_out.text().strip() or self._default_out_for()
+            if not out_file.lower().endswith(".pptx"):
+                out_file += ".pptx"
+
+            quality = int(self.sp_quality.value())
+
+            def job(progress, cancel):
+                return pdf_to_pptx_snapshots(
+                    src, out_file, dpi=dpi, fmt="jpg" if quality else "png", jpg_quality=quality or 85,
+                    page_range=rng, progress=progress, cancel=cancel,
+                )
+
+            def done(res):
                 db.add_history(tab="PDF", action="Convert → PPTX(snap)", src_name=src.name, out_path=res)
-                QMessageBox.information(self, "Готово", text)
-            elif kind == "TXT":
-                out_file = self.ed_out.text().strip() or self._default_out_for()
-                res = pdf_to_text(src, out_file)
-                text = f"PDF→TXT: \"{res}\""
-                self.entry_logged.emit(text)
+                return f"PDF→PPTX (снимки): \"{res}\""
+        elif kind == "Разделить PDF":
+            out_dir = self.ed_out.text().strip() or self._default_out_for()
+            every = int(self.sp_every.value()) or None
+            ranges = [r.strip() for r in (rng or "").split(";") if r.strip()]
+            if not every and not ranges:
+                QMessageBox.warning(self, "Нет частей", "Укажите диапазоны частей через «;» или число страниц в каждой части.")
+                return
+            report: dict = {}
+
+            def job(progress, cancel):
+                return split_pdf(src, out_dir, ranges=ranges, every=every, report=report, progress=progress, cancel=cancel)
+
+            def done(parts):
+                db.add_history(tab="PDF", action="Разделение", src_name=src.name, out_path=out_dir)
+                return (
+                    f"PDF разделён на {len(parts)} частей в \"{out_dir}\" "
+                    f"({report['size_before'] / 1024:.0f} КБ → {report['size_after'] / 1024:.0f} КБ всего)"
+                )
+        else:
+            out_file = self.ed_out.text().strip() or self._default_out_for()
+            mode = self.cmb_text_mode.currentData()
+            per_page = self.cb_per_page.isChecked()
+            index = Settings.pdf_index_text()
+            if per_page and out_file.lower().endswith(".txt"):
+                out_file = out_file[:-4]
+
+            def job(progress, cancel):
+                return pdf_to_text(
+                    src, out_file, mode=mode, page_range=rng, per_page=per_page,
+                    index=index, progress=progress, cancel=cancel,
+                )
+
+            def done(res):
                 db.add_history(tab="PDF", action="Convert → TXT", src_name=src.name, out_path=res)
-                QMessageBox.information(self, "Готово", text)
-        except Exception as e:
-            QMessageBox.critical(self, "Ошибка", str(e))
+                return f"PDF→TXT: \"{res}\""
+        self._run(job, done)
+
+
+    def _run(self, job, done):
+        self.btn_go.setEnabled(False)
+        dialog = QProgressDialog("Конвертация...", "Отмена", 0, 100, self)
+        dialog.setWindowTitle("Конвертация PDF")
+        dialog.setAutoClose(False)
+        dialog.setAutoReset(False)
+        dialog.setValue(0)
+
+        thread = QThread(self)
+        worker = TaskWorker(job)
+        worker.moveToThread(thread)
+        result: list = []
+        errors: list[str] = []
+
+        def on_finished():
+            cancelled = worker.is_cancelled()
+            dialog.canceled.disconnect(worker.cancel)
+            dialog.close()
+            self.btn_go.setEnabled(True)
+            thread.quit()
+            thread.wait()
+            worker.deleteLater()
+            thread.deleteLater()
+            if cancelled:
+                QMessageBox.information(self, "Отменено", "Конвертация отменена.")
+                return
+            if errors or not result:
+                QMessageBox.critical(self, "Ошибка", errors[0] if errors else "Результат не получен")
+                return
+            try:
+                text = done(result[0])
+            except Exception as e:
+                QMessageBox.critical(self, "Ошибка", str(e))
+                return
+            self.entry_logged.emit(text)
+            QMessageBox.information(self, "Готово", text)
+
+        worker.progress.connect(dialog.setValue)
+        worker.done.connect(result.append)
+        worker.failed.connect(errors.append)
+        worker.finished.connect(on_finished)
+        dialog.canceled.connect(worker.cancel)
+        thread.started.connect(worker.run)
+        thread.start()
+        dialog.show()
@@ -1,22 +1,72 @@
 from __future__ import annotations
 from pathlib import Path
-from PyQt6.QtCore import Qt, pyqtSignal
+from PyQt6.QtCore import Qt, pyqtSignal, QThread, QSize, QTimer
+from PyQt6.QtGui import QIcon, QPixmap
 from PyQt6.QtWidgets import (
-    QWidget, QVBoxLayout, QLabel, QListWidget, QPushButton,
+    QWidget, QVBoxLayout, QLabel, QListWidget, QPushButton, QProgressDialog,
     QHBoxLayout, QFileDialog, QLineEdit, QMessageBox, QGroupBox, QFormLayout, QCheckBox, QSpinBox
 )
-from compressor_and_pdf_merger.services.pdf_merge import merge_any_to_pdf
+from compressor_and_pdf_merger.services.pdf_merge import merge_any_to_pdf, merge_any_to_pdf_chunked
 from compressor_and_pdf_merger.storage import db
 from compressor_and_pdf_merger.services.settings import Settings
+from compressor_and_pdf_merger.ui.worker import TaskWorker, ThumbnailLoader
 
 
 
+# longer lists are merged chunk by chunk through intermediate files, which keeps memory flat and allows resuming
+CHUNKED_MERGE_FROM = 300
+
+
 class ReorderList(QListWidget):
     def __init__(self):
         super().__init__()
         self.setSelectionMode(QListWidget.SelectionMode.ExtendedSelection)
         self.setDragDropMode(QListWidget.DragDropMode.InternalMove)
         self.setDefaultDropAction(Qt.DropAction.MoveAction)
+        self.setIconSize(QSize(36, 48))
+        # thumbnails are requested only for rows on screen, so adding hundreds of files stays instant
+        self._icons: dict[str, QIcon] = {}
+        self._requested: set[str] = set()
+        self._thumbs = ThumbnailLoader(self)
+        self._thumbs.ready.connect(self._on_thumb)
+        self._visible_timer = QTimer(self)
+        self._visible_timer.setSingleShot(True)
+        self._visible_timer.setInterval(50)
+        self._visible_timer.timeout.connect(self._load_visible)
+        self.verticalScrollBar().valueChanged.connect(lambda _: self._visible_timer.start())
+        self.model().rowsInserted.connect(lambda *_: self._visible_timer.start())
+
+    def resizeEvent(self, e):
+        super().resizeEvent(e)
+        self._visible_timer.start()
+
+    def _load_visible(self):
+        if self.count() == 0:
+            return
+        vp = self.viewport().rect()
+        top = self.indexAt(vp.topLeft()).row()
+        bottom = self.indexAt(vp.bottomLeft()).row()
+        if top < 0:
+            return
+        if bottom < 0:
+            bottom = self.count() - 1
+        for row in range(top, bottom + 1):
+            item = self.item(row)
+            path = item.text()
+            if path in self._icons:
+                if item.icon().isNull():
+                    item.setIcon(self._icons[path])
+            elif path not in self._requested:
+                self._requested.add(path)
+                self._thumbs.request(path)
+
+    def _on_thumb(self, path: str, page: int, data: bytes):
+        pm = QPixmap()
+        if not pm.loadFromData(data):
+            return
+        icon = self._icons[path] = QIcon(pm)
+        for it in self.findItems(path, Qt.MatchFlag.MatchExactly):
+            it.setIcon(icon)
 
 
 class PdfMergeTab(QWidget):
@@ -51,6 +101,15 @@ class PdfMergeTab(QWidget):
         self.sp_margin.setEnabled(self.cb_a4.isChecked())
         self.cb_a4.toggled.connect(self.sp_margin.setEnabled)
         form.addRow(self.cb_a4, self.sp_margin)
+        self.sp_img_dpi = QSpinBox()
+        self.sp_img_dpi.setRange(0, 1200)
+        self.sp_img_dpi.setSingleStep(50)
+        self.sp_img_dpi.setValue(300)
+        self.sp_img_dpi.setSuffix(" dpi")
+        self.sp_img_dpi.setSpecialValueText("без ограничения")
+        self.sp_img_dpi.setEnabled(self.cb_a4.isChecked())
+        self.cb_a4.toggled.connect(self.sp_img_dpi.setEnabled)
+        form.addRow(QLabel("Макс. разрешение фото:"), self.sp_img_dpi)
         root.addWidget(grp)
 
         out_row = QHBoxLayout()
@@ -140,17 +199,73 @@ class PdfMergeTab(QWidget):
             out += ".pdf"
             self.ed_out.setText(out)
         inputs = self._selected_files()
-        try:
-            res = merge_any_to_pdf(
-                inputs,
-                out,
-                fit_to_a4=self.cb_a4.isChecked(),
-                fit_margin_mm=self.sp_margin.value(),
-            )
-            out_for_history = res or out
+        report: dict = {}
+        fit_to_a4 = self.cb_a4.isChecked()
+        margin = self.sp_margin.value()
+        max_dpi = self.sp_img_dpi.value() or None
+        index = Settings.pdf_index_text()
+
+        self.btn_merge.setEnabled(False)
+        dialog = QProgressDialog("Объединение PDF...", "Отмена", 0, 100, self)
+        dialog.setWindowTitle("Объединение")
+        dialog.setAutoClose(False)
+        dialog.setAutoReset(False)
+        dialog.setValue(0)
+
+        merge = merge_any_to_pdf_chunked if len(inputs) >= CHUNKED_MERGE_FROM else merge_any_to_pdf
+        thread = QThread(self)
+        # both paths get the same output options; the chunked one only changes how the work is split
+        worker = TaskWorker(lambda progress, cancel: merge(
+            inputs,
+            out,
+            slim=True,
+            linearize=True,
+            fit_to_a4=fit_to_a4,
+            fit_margin_mm=margin,
+            max_image_dpi=max_dpi,
+            index=index,
+            report=report,
+            progress=progress,
+            cancel=cancel,
+        ))
+        worker.moveToThread(thread)
+        result: list[str] = []
+        errors: list[str] = []
+
+        def on_finished():
+            cancelled = worker.is_cancelled()
+            dialog.canceled.disconnect(worker.cancel)
+            dialog.close()
+            self.btn_merge.setEnabled(True)
+            thread.quit()
+            thread.wait()
+            worker.deleteLater()
+            thread.deleteLater()
+            if cancelled:
+                QMessageBox.information(self, "Отменено", "Объединение отменено.")
+                return
+            if errors or not result:
+                QMessageBox.critical(self, "Ошибка", errors[0] if errors else "Итоговый файл не создан")
+                return
+            out_for_history = result[0] or out
             text = f"PDF: объединено {len(inputs)} → \"{out_for_history}\""
+            if report.get("size_before"):
+                text += f" ({report['size_before'] / 1024:.0f} КБ → {report['size_after'] / 1024:.0f} КБ после урезания шрифтов)"
+            if report.get("images_downsampled"):
+                text += f"\nУменьшено изображений: {report['images_downsampled']}"
+            if report.get("cache_hits"):
+                text += f"\nОфисных файлов из кэша конвертации: {report['cache_hits']}"
+            if report.get("linearized"):
+                text += f"\nБыстрый веб-просмотр: первая страница — {report['first_page_bytes'] / 1024:.0f} КБ"
             self.entry_logged.emit(text)
             db.add_history(tab="PDF", action="Объединение", src_name=f"{len(inputs)} файлов", out_path=out_for_history)
             QMessageBox.information(self, "Готово", text)
-        except Exception as e:
-            QMessageBox.critical(self, "Ошибка", str(e))
+
+        worker.progress.connect(dialog.setValue)
+        worker.done.connect(result.append)
+        worker.failed.connect(errors.append)
+        worker.finished.connect(on_finished)
+        dialog.canceled.connect(worker.cancel)
+        thread.started.connect(worker.run)
+        thread.start()
+        dialog.show()
@@ -61,6 +61,9 @@ class SettingsTab(QWidget):
         row_pdf_dir.addWidget(self.ed_pdf_dir, 1)
         row_pdf_dir.addWidget(btn_pdf_dir)
         pdf_lay.addLayout(row_pdf_dir)
+        self.cb_pdf_index = QCheckBox("Индексировать текст обработанных PDF для поиска (вкладка «История»)")
+        self.cb_pdf_index.setChecked(Settings.pdf_index_text())
+        pdf_lay.addWidget(self.cb_pdf_index)
         layout.addWidget(grp_pdf)
 
         layout.addStretch(1)
@@ -78,6 +81,7 @@ class SettingsTab(QWidget):
 
         btn_pdf_dir.clicked.connect(self._choose_pdf_dir)
         self.ed_pdf_dir.textChanged.connect(Settings.set_pdf_default_dir)
+        self.cb_pdf_index.toggled.connect(Settings.set_pdf_index_text)
 
     def _choose_img_dir(self):
         d = QFileDialog.getExistingDirectory(self, "Папка для изображений", self.ed_img_dir.text().strip())
@@ -1,6 +1,8 @@
 from __future__ import annotations
 from PyQt6.QtCore import QObject, pyqtSignal
-from typing import Callable
+from typing import Callable, Iterable
+import threading
+from compressor_and_pdf_merger.services.thumbnails import get_thumbnail_service
 
 class BatchWorker(QObject):
     progress = pyqtSignal(int)
@@ -29,3 +31,80 @@ class BatchWorker(QObject):
                 self.file_fail.emit(f, str(e))
             self.progress.emit(int(i * 100 / total))
         self.finished.emit()
+
+
+class CallWorker(QObject):
+    done = pyqtSignal(object)
+    failed = pyqtSignal(str)
+    finished = pyqtSignal()
+
+    def __init__(self, func: Callable[[], object]):
+        super().__init__()
+        self._func = func
+
+    def run(self):
+        try:
+            self.done.emit(self._func())
+        except Exception as e:
+            self.failed.emit(str(e))
+        self.finished.emit()
+
+
+class IterWorker(QObject):
+    progress = pyqtSignal(int)
+    item = pyqtSignal(object)
+    failed = pyqtSignal(str)
+    finished = pyqtSignal()
+
+    def __init__(self, func: Callable[[Callable[[int, int], None], threading.Event], Iterable[object]]):
+        super().__init__()
+        self._func = func
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def is_cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def _report(self, done: int, total: int):
+        self.progress.emit(int(done * 100 / max(1, total)))
+
+    def run(self):
+        try:
+            for it in self._func(self._report, self._cancel):
+                self.item.emit(it)
+        except Exception as e:
+            self.failed.emit(str(e))
+        self.finished.emit()
+
+
+class TaskWorker(IterWorker):
+    # one cancellable call with progress; the result comes through done, as with CallWorker
+    done = pyqtSignal(object)
+
+    def __init__(self, func: Callable[[Callable[[int, int], None], threading.Event], object]):
+        super().__init__(func)
+
+    def run(self):
+        try:
+            self.done.emit(self._func(self._report, self._cancel))
+        except Exception as e:
+            self.failed.emit(str(e))
+        self.finished.emit()
+
+
+class ThumbnailLoader(QObject):
+    # the service calls back from its pool thread; the signal hands the PNG bytes over to the GUI thread
+    ready = pyqtSignal(str, int, bytes)
+
+    def __init__(self, parent: QObject | None = None):
+        super().__init__(parent)
+        self._service = get_thumbnail_service()
+
+    def request(self, path: str, page: int = 0) -> None:
+        self._service.request(path, page, self._deliver)
+
+    def _deliver(self, path: str, page: int, data: bytes | None) -> None:
+        if data:
+            self.ready.emit(path, page, data)
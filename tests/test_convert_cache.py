@@ -0,0 +1,61 @@
+import os
+from pathlib import Path
+
+from compressor_and_pdf_merger.services import office_convert
+from compressor_and_pdf_merger.services.convert_cache import ConvertCache, cached_convert
+
+
+def test_fallback_output_is_stored_under_the_backend_that_made_it(tmp_path):
+    cache = ConvertCache(tmp_path / "cache")
+    src, out = tmp_path / "a.docx", tmp_path / "a.pdf"
+    src.write_bytes(b"doc")
+    calls = []
+
+    def convert(s: Path, o: Path) -> str:
+        calls.append(s)
+        o.write_bytes(b"%PDF fallback")
+        return "basic"
+
+    # the preferred converter failed, so its key must stay empty
+    assert not cached_convert(src, out, "soffice", convert, cache)
+    assert not cached_convert(src, out, "soffice", convert, cache)
+    assert len(calls) == 2
+    # once the fallback is what runs first, its output is reused
+    assert cached_convert(src, out, "basic", convert, cache)
+    assert len(calls) == 2 and out.read_bytes() == b"%PDF fallback"
+
+
+def test_soffice_fingerprint_follows_system_fonts(tmp_path, monkeypatch):
+    exe, fonts = tmp_path / "soffice", tmp_path / "fonts"
+    exe.write_bytes(b"")
+    fonts.mkdir()
+    monkeypatch.setattr(office_convert, "_system_font_dirs", lambda: [fonts])
+    ctx = office_convert.get_converter_context()
+    monkeypatch.setattr(ctx, "soffice", lambda: str(exe))
+    ctx.reset()
+    before = office_convert.converter_fingerprint("a.docx", "soffice")
+    (fonts / "extra").mkdir()
+    ctx.reset()
+    after = office_convert.converter_fingerprint("a.docx", "soffice")
+    ctx.reset()
+    assert before.startswith("soffice|.docx|") and before != after
+    assert office_convert.converter_fingerprint("a.docx", "basic").startswith("basic|.docx|")
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ConvertCache(tmp_path / "cache", max_bytes=250)
+    pdf = tmp_path / "x.pdf"
+    pdf.write_bytes(b"p" * 100)
+    cache.put("a", pdf)
+    cache.put("b", pdf)
+    os.utime(cache.root / "a.pdf", (1, 1))
+    os.utime(cache.root / "b.pdf", (2, 2))
+    # reading "a" makes "b" the oldest entry
+    assert cache.get("a", tmp_path / "out.pdf")
+    cache.put("c", pdf)
+    assert sorted(p.name for p in cache.root.iterdir()) == ["a.pdf", "c.pdf"]
+    assert cache.size_bytes() == 200 and cache.stats["evictions"] == 1
+    # an entry larger than the whole cache is not stored
+    pdf.write_bytes(b"p" * 300)
+    cache.put("d", pdf)
+    assert not cache.get("d", tmp_path / "out.pdf")
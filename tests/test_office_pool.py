@@ -0,0 +1,42 @@
+import multiprocessing as mp
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from compressor_and_pdf_merger.services import office_pool
+
+
+def _child_pool() -> tuple[str, int, int]:
+    pool = office_pool.get_pool("/bin/true")
+    pool.profile_root.mkdir(parents=True, exist_ok=True)
+    return str(pool.profile_root), pool.size, pool.pid
+
+
+@pytest.mark.skipif("fork" not in mp.get_all_start_methods(), reason="needs fork")
+def test_forked_worker_leaves_parent_pool_alone():
+    parent = office_pool.get_pool("/bin/true")
+    parent.profile_root.mkdir(parents=True, exist_ok=True)
+    try:
+        with ProcessPoolExecutor(1, mp_context=mp.get_context("fork")) as ex:
+            child_root, child_size, child_pid = ex.submit(_child_pool).result()
+        # the worker got its own single-instance pool and cleaned up only that one on exit
+        assert child_pid != os.getpid()
+        assert child_size == 1
+        assert child_root != str(parent.profile_root)
+        assert not Path(child_root).exists()
+        assert parent.profile_root.exists()
+        assert office_pool.get_pool("/bin/true") is parent
+    finally:
+        office_pool.shutdown_pool()
+    assert not parent.profile_root.exists()
+
+
+def test_shutdown_ignores_pool_of_another_process(tmp_path):
+    pool = office_pool.OfficePool("/bin/true", size=1, profile_root=tmp_path / "profiles")
+    pool.profile_root.mkdir()
+    pool.pid = -1
+    pool.shutdown()
+    assert pool.profile_root.exists()
+    assert not pool._closed
@@ -0,0 +1,23 @@
+import io
+
+import fitz
+from PIL import Image
+
+from compressor_and_pdf_merger.services.pdf_analyze import analyze_pdf
+
+
+def _png(w: int, h: int) -> bytes:
+    buf = io.BytesIO()
+    Image.effect_noise((w, h), 60).convert("RGB").save(buf, "PNG")
+    return buf.getvalue()
+
+
+def test_small_logo_dpi_uses_placement(tmp_path):
+    # a 150 px logo drawn half an inch wide is 300 dpi, not "150 px over the page width"
+    src = tmp_path / "logo.pdf"
+    with fitz.open() as doc:
+        page = doc.new_page()
+        page.insert_image(fitz.Rect(36, 36, 72, 72), stream=_png(150, 150))
+        doc.save(src)
+    b = analyze_pdf(src)
+    assert [k.split(", ", 1)[1] for k in b.images] == ["200–300 dpi"]
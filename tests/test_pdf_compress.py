@@ -0,0 +1,30 @@
+import fitz
+
+from compressor_and_pdf_merger.services.pdf_compress import compress_pdf, compress_pdf_batch
+
+
+def test_linearize_keeps_never_larger(tmp_path):
+    # a compact one-page file: linearization hints cost more than optimization saves
+    src = tmp_path / "tiny.pdf"
+    out = tmp_path / "out.pdf"
+    with fitz.open() as doc:
+        doc.new_page().insert_text((72, 72), "hi")
+        doc.save(src, garbage=4, deflate=True, use_objstms=1)
+    compress_pdf(src, out, mode="lossless", linearize=True)
+    assert out.stat().st_size <= src.stat().st_size
+
+
+def test_batch_keeps_duplicate_sources_apart(tmp_path):
+    src = tmp_path / "doc.pdf"
+    with fitz.open() as doc:
+        for i in range(3):
+            doc.new_page().insert_text((72, 72), f"page {i}")
+        doc.save(src)
+    outs = [tmp_path / "a.pdf", tmp_path / "b.pdf"]
+    seen = []
+    results = list(compress_pdf_batch([(src, o) for o in outs], progress=lambda d, t: seen.append((d, t)), workers=1))
+    assert sorted(r[1] for r in results) == sorted(str(o) for o in outs)
+    assert all(r[2] is None for r in results)
+    # each job reports into its own dict, and progress counts both copies
+    assert results[0][3] is not results[1][3]
+    assert seen[-1] == (6, 6)
@@ -0,0 +1,62 @@
+import fitz
+import numpy as np
+import pytest
+from PIL import Image
+
+from compressor_and_pdf_merger.services import pdf_convert
+from compressor_and_pdf_merger.services.pdf_convert import pdf_to_images
+
+
+def _vector_pdf(path) -> None:
+    with fitz.open() as doc:
+        page = doc.new_page(width=300, height=420)
+        page.draw_rect(fitz.Rect(20, 30, 280, 400), color=(1, 0, 0), fill=(0.2, 0.6, 0.9))
+        page.draw_line((0, 0), (300, 420), color=(0, 0, 0), width=3)
+        page.insert_text((40, 100), "banded export", fontsize=18)
+        doc.save(path)
+
+
+def _reference(path, dpi: int, rgb: bool) -> np.ndarray:
+    with fitz.open(path) as doc:
+        pix = doc[0].get_pixmap(dpi=dpi, colorspace=fitz.csRGB if rgb else fitz.csGRAY, alpha=False)
+        return np.frombuffer(pix.samples, np.uint8).reshape(pix.height, pix.width, pix.n)
+
+
+@pytest.mark.parametrize("fmt,rgb", [("png", True), ("png", False), ("tif", True)])
+def test_banded_export_matches_full_render(tmp_path, monkeypatch, fmt, rgb):
+    src = tmp_path / "v.pdf"
+    _vector_pdf(src)
+    # force bands of a few dozen rows on a small page
+    monkeypatch.setattr(pdf_convert, "BAND_THRESHOLD_BYTES", 1)
+    monkeypatch.setattr(pdf_convert, "BAND_BYTES", 20_000)
+    out = pdf_to_images(src, tmp_path / "out", fmt=fmt, dpi=100, rgb=rgb, workers=1)
+    ref = _reference(src, 100, rgb)
+    with Image.open(out[0]) as im:
+        assert im.mode == ("RGB" if rgb else "L")
+        got = np.asarray(im).reshape(ref.shape)
+        assert round(im.info["dpi"][0]) == 100
+    # bands replay one display list with a clip, so they reassemble the full render exactly
+    assert np.array_equal(got, ref)
+
+
+def test_banded_jpeg_has_full_size(tmp_path, monkeypatch):
+    src = tmp_path / "v.pdf"
+    _vector_pdf(src)
+    monkeypatch.setattr(pdf_convert, "BAND_THRESHOLD_BYTES", 1)
+    monkeypatch.setattr(pdf_convert, "BAND_BYTES", 20_000)
+    out = pdf_to_images(src, tmp_path / "out", fmt="jpg", dpi=100, workers=1)
+    ref = _reference(src, 100, True)
+    with Image.open(out[0]) as im:
+        assert im.size == (ref.shape[1], ref.shape[0])
+        got = np.asarray(im.convert("RGB")).astype(int)
+    assert np.abs(got - ref).mean() < 4
+
+
+def test_bands_tile_the_page_exactly():
+    with fitz.open() as doc:
+        page = doc.new_page(width=301.3, height=419.7)
+        bands = list(pdf_convert._iter_bands(page, 97 / 72.0, fitz.csRGB, band_bytes=30_000))
+        full = (page.rect * fitz.Matrix(97 / 72.0, 97 / 72.0)).irect
+    assert len(bands) > 1
+    assert sum(b.shape[0] for b in bands) == full.height
+    assert {b.shape[1] for b in bands} == {full.width}
@@ -0,0 +1,21 @@
+import fitz
+
+from compressor_and_pdf_merger.services.pdf_merge import merge_any_to_pdf
+
+
+def _with_toc(path, name: str, pages: int) -> None:
+    with fitz.open() as doc:
+        for i in range(pages):
+            doc.new_page().insert_text((72, 72), f"{name} {i}")
+        doc.set_toc([[1, f"{name} 1", 1], [2, f"{name} 1.1", 2], [1, f"{name} 2", pages]])
+        doc.save(path)
+
+
+def test_merge_keeps_outlines_with_offsets(tmp_path):
+    a, b, out = tmp_path / "a.pdf", tmp_path / "b.pdf", tmp_path / "out.pdf"
+    _with_toc(a, "A", 3)
+    _with_toc(b, "B", 4)
+    merge_any_to_pdf([a, b], out, page_ranges={"b.pdf": "2-4"}, linearize=False)
+    with fitz.open(out) as doc:
+        # "B 1" points at a page that was left out, so its child moves up a level
+        assert doc.get_toc() == [[1, "A 1", 1], [2, "A 1.1", 2], [1, "A 2", 3], [1, "B 1.1", 4], [1, "B 2", 6]]
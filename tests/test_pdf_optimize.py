@@ -0,0 +1,38 @@
+import pikepdf
+from pikepdf import Array, Dictionary, Name
+
+from compressor_and_pdf_merger.services.pdf_optimize import dedupe_objects, optimize_pdf_lossless
+
+
+def _shared_arrays_pdf() -> pikepdf.Pdf:
+    # two fonts with identical but separate indirect /Widths arrays, as produced by merging documents that share a font
+    pdf = pikepdf.new()
+    for _ in range(2):
+        pdf.add_blank_page()
+    for i, page in enumerate(pdf.pages):
+        widths = pdf.make_indirect(Array([500] * 10))
+        parms = pdf.make_indirect(Dictionary(Predictor=15, Columns=4))
+        font = Dictionary(Type=Name.Font, Subtype=Name.Type1, BaseFont=Name.Helvetica, FirstChar=32, LastChar=41, Widths=widths)
+        image = pikepdf.Stream(pdf, bytes(12), Type=Name.XObject, Subtype=Name.Image, Width=2, Height=2, ColorSpace=Name.DeviceRGB, BitsPerComponent=8)
+        image["/DecodeParms"] = pdf.make_indirect(Array([parms]))
+        page.obj["/Resources"] = Dictionary(Font=Dictionary(F1=font), XObject=Dictionary(Im1=image))
+        page.obj["/Contents"] = pikepdf.Stream(pdf, f"BT /F1 12 Tf 72 72 Td (p{i}) Tj ET q 10 0 0 10 0 0 cm /Im1 Do Q".encode())
+    return pdf
+
+
+def test_dedupe_objects_shared_arrays():
+    pdf = _shared_arrays_pdf()
+    assert dedupe_objects(pdf) >= 2
+    fonts = [p.obj.Resources.Font.F1 for p in pdf.pages]
+    assert fonts[0].Widths.objgen == fonts[1].Widths.objgen
+
+
+def test_optimize_lossless_shared_arrays(tmp_path):
+    src = tmp_path / "in.pdf"
+    out = tmp_path / "out.pdf"
+    _shared_arrays_pdf().save(src)
+    report = {}
+    optimize_pdf_lossless(src, out, report=report)
+    with pikepdf.open(out) as pdf:
+        assert len(pdf.pages) == 2
+    assert report["savings"]["streams"]["dedup"] > 0
@@ -0,0 +1,77 @@
+import threading
+
+import fitz
+import pikepdf
+import pytest
+
+from compressor_and_pdf_merger.services.pdf_split import split_pdf, split_plan
+from compressor_and_pdf_merger.services.pdf_utils import OperationCancelled
+
+
+def _numbered(path, pages: int) -> None:
+    with fitz.open() as doc:
+        for i in range(pages):
+            doc.new_page().insert_text((72, 72), f"page {i + 1}")
+        doc.save(path)
+
+
+def _texts(path) -> list[str]:
+    with fitz.open(path) as doc:
+        return [p.get_text().strip() for p in doc]
+
+
+def test_plan_from_ranges_and_every():
+    assert split_plan(10, ranges=["1-3,7", "9-", "20-30"]) == [[0, 1, 2, 6], [8, 9]]
+    assert split_plan(5, every=2) == [[0, 1], [2, 3], [4]]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_parts_hold_their_pages(tmp_path, workers):
+    src = tmp_path / "doc.pdf"
+    _numbered(src, 7)
+    report = {}
+    outs = split_pdf(src, tmp_path / "out", ranges=["2-3", "7,1"], workers=workers, report=report)
+    assert [_texts(o) for o in outs] == [["page 2", "page 3"], ["page 7", "page 1"]]
+    assert report["parts"] == 2 and report["pages"] == 7
+
+
+def test_inherited_resources_are_pruned_per_part(tmp_path):
+    src = tmp_path / "inherited.pdf"
+    with pikepdf.new() as pdf:
+        fonts = pikepdf.Dictionary()
+        for i in range(3):
+            name = f"/F{i}"
+            fonts[name] = pdf.make_indirect(pikepdf.Dictionary(Type=pikepdf.Name.Font, Subtype=pikepdf.Name.Type1, BaseFont=pikepdf.Name.Helvetica))
+            pdf.add_blank_page(page_size=(200, 200))
+            pdf.pages[i].obj.Contents = pdf.make_stream(f"BT {name} 12 Tf 20 100 Td (page {i + 1}) Tj ET".encode())
+        # the pages carry no /Resources of their own; all fonts come from the page tree
+        pdf.Root.Pages.Resources = pikepdf.Dictionary(Font=fonts)
+        for page in pdf.pages:
+            if "/Resources" in page.obj:
+                del page.obj["/Resources"]
+        pdf.save(src)
+    report = {}
+    outs = split_pdf(src, tmp_path / "out", every=1, workers=1, report=report)
+    assert [_texts(o) for o in outs] == [["page 1"], ["page 2"], ["page 3"]]
+    assert report["resources_removed"] > 0
+    with pikepdf.open(outs[1]) as part:
+        assert set(part.pages[0].Resources.Font.keys()) == {"/F1"}
+
+
+def test_cancel_leaves_no_parts(tmp_path):
+    src = tmp_path / "doc.pdf"
+    _numbered(src, 40)
+    cancel = threading.Event()
+    out_dir = tmp_path / "out"
+
+    def progress(done, total):
+        if done == 3:
+            cancel.set()
+
+    with pytest.raises(OperationCancelled):
+        split_pdf(src, out_dir, every=1, workers=2, progress=progress, cancel=cancel)
+    for _ in range(50):
+        if not any(out_dir.iterdir()):
+            break
+        threading.Event().wait(0.1)
+    assert list(out_dir.iterdir()) == []
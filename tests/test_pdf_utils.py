@@ -0,0 +1,21 @@
+import builtins
+
+from compressor_and_pdf_merger.services import pdf_utils
+
+
+def test_rss_is_unknown_rather_than_a_lifetime_peak(monkeypatch):
+    real_open = builtins.open
+
+    def no_proc(path, *args, **kwargs):
+        if str(path).startswith("/proc/"):
+            raise OSError("no procfs")
+        return real_open(path, *args, **kwargs)
+
+    monkeypatch.setattr(pdf_utils.os, "name", "posix")
+    monkeypatch.setattr(builtins, "open", no_proc)
+    assert pdf_utils.rss_mb() is None
+
+
+def test_rss_is_current_size_on_linux():
+    rss = pdf_utils.rss_mb()
+    assert rss is None or 1 < rss < 100_000
@@ -0,0 +1,77 @@
+import os
+import sqlite3
+
+import fitz
+
+from compressor_and_pdf_merger.services import text_index
+from compressor_and_pdf_merger.services.text_index import ROWID_SPAN, index_pdf, index_stats, page_sink, prune_index, search
+
+
+def _pdf(path, words: list[str]) -> None:
+    with fitz.open() as doc:
+        for w in words:
+            doc.new_page().insert_text((72, 72), w)
+        doc.save(path)
+
+
+def test_search_finds_page_and_prefix(tmp_path):
+    db, pdf = tmp_path / "idx.sqlite3", tmp_path / "a.pdf"
+    _pdf(pdf, ["alpha", "invoice 2024", "gamma"])
+    assert index_pdf(pdf, db_path=db) == 3
+    hits = search("invo", db_path=db)
+    assert [(h.path, h.page) for h in hits] == [(str(pdf.resolve()), 2)]
+    # the same content under another name is linked, not indexed twice
+    copy = tmp_path / "b.pdf"
+    copy.write_bytes(pdf.read_bytes())
+    assert index_pdf(copy, db_path=db) == 0
+    assert {h.path for h in search("gamma", db_path=db)} == {str(pdf.resolve()), str(copy.resolve())}
+    assert index_stats(db_path=db) == {"docs": 1, "pages": 3, "paths": 2}
+
+
+def test_prune_drops_deleted_and_changed_files(tmp_path):
+    db, a, b = tmp_path / "idx.sqlite3", tmp_path / "a.pdf", tmp_path / "b.pdf"
+    _pdf(a, ["apple"])
+    _pdf(b, ["banana"])
+    index_pdf(a, db_path=db)
+    index_pdf(b, db_path=db)
+    a.unlink()
+    _pdf(b, ["cherry"])
+    os.utime(b, (1, 1))
+    # stale paths are hidden right away, before any prune
+    assert search("apple", db_path=db) == [] and search("banana", db_path=db) == []
+    assert prune_index(db_path=db) == 2
+    assert index_stats(db_path=db) == {"docs": 0, "pages": 0, "paths": 0}
+    with sqlite3.connect(db) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM pages_fts").fetchone()[0] == 0
+
+
+def test_sink_flushes_in_batches_and_discards_on_close(tmp_path, monkeypatch):
+    monkeypatch.setattr(text_index, "FLUSH_PAGES", 2)
+    db, pdf = tmp_path / "idx.sqlite3", tmp_path / "a.pdf"
+    _pdf(pdf, ["one"])
+    sink = page_sink(pdf, db_path=db)
+    for i in range(5):
+        sink.add(i, f"word{i}")
+    assert sink._rows == [("word4", 5)]
+    sink.close()
+    assert index_stats(db_path=db)["docs"] == 0
+    sink = page_sink(pdf, db_path=db)
+    for i in range(5):
+        sink.add(i, f"word{i}")
+    assert sink.commit(5) == 5
+    assert [h.page for h in search("word3", db_path=db)] == [4]
+    with sqlite3.connect(db) as conn:
+        doc_id = conn.execute("SELECT id FROM docs").fetchone()[0]
+        rowids = [r[0] for r in conn.execute("SELECT rowid FROM pages_fts ORDER BY rowid")]
+    assert rowids == [doc_id * ROWID_SPAN + p for p in range(1, 6)]
+
+
+def test_legacy_rowids_are_renumbered(tmp_path):
+    db = tmp_path / "idx.sqlite3"
+    text_index._connect(db).close()
+    with sqlite3.connect(db) as conn:
+        conn.execute("PRAGMA user_version = 0")
+        conn.execute("INSERT INTO pages_fts(text, doc_id, page) VALUES ('old', 3, 2)")
+    text_index._connect(db).close()
+    with sqlite3.connect(db) as conn:
+        assert conn.execute("SELECT rowid FROM pages_fts").fetchall() == [(3 * ROWID_SPAN + 2,)]
@@ -0,0 +1,40 @@
+import os
+import threading
+
+import fitz
+
+from compressor_and_pdf_merger.services.thumbnails import ThumbnailCache, ThumbnailService
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = ThumbnailCache(tmp_path, max_bytes=25)
+    cache.put("a", b"x" * 10)
+    cache.put("b", b"y" * 10)
+    os.utime(tmp_path / "a.png", (1, 1))
+    os.utime(tmp_path / "b.png", (2, 2))
+    assert cache.get("a") == b"x" * 10
+    cache.put("c", b"z" * 10)
+    assert cache.get("b") is None
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["a.png", "c.png"]
+
+
+def test_service_renders_once_then_serves_from_cache(tmp_path):
+    pdf = tmp_path / "a.pdf"
+    with fitz.open() as doc:
+        doc.new_page().insert_text((72, 72), "thumb")
+        doc.save(pdf)
+    service = ThumbnailService(ThumbnailCache(tmp_path / "thumbs"), workers=1)
+    got, done = [], threading.Event()
+
+    def callback(path, page, data):
+        got.append(data)
+        done.set()
+
+    try:
+        service.request(pdf, 0, callback)
+        assert done.wait(60)
+        service.request(pdf, 0, callback)
+    finally:
+        service.shutdown()
+    assert got[0] is not None and got[0].startswith(b"\x89PNG") and got[1] == got[0]
+    assert service.stats == {"hits": 1, "rendered": 1, "failed": 0}